@@ -0,0 +1,8 @@
+from .store import ArchiveIndex, DayEntry, RunEntry, SeasonArchive
+
+__all__ = [
+    "ArchiveIndex",
+    "DayEntry",
+    "RunEntry",
+    "SeasonArchive",
+]
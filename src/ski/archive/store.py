@@ -0,0 +1,329 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from ski.cli import build_ingest_parser
+from ski.config import load_course
+from ski.gpx import Course, GPXData, Point, TrackArrays, season_laps
+from ski.logger import get_logger, setup_logger
+from ski.utils import file_digest
+
+logger = get_logger()
+
+INDEX_FILE = "index.json"
+
+# lat/lon are stored as fixed-point int32 (1e-7 degrees, ~1 cm)
+COORD_SCALE = 10_000_000
+
+COLUMNS = {
+    "time": np.int64,  # milliseconds since epoch (UTC)
+    "lat": np.int32,
+    "lon": np.int32,
+    "ele": np.float32,
+}
+
+
+class RunEntry(BaseModel):
+    """A contiguous block of rows in a day chunk, one per GPX segment."""
+
+    source: str
+    track: int
+    segment: int
+    start_row: int
+    stop_row: int
+    start: float
+    end: float
+    utc_offset: float = 0.0
+
+
+class DayEntry(BaseModel):
+    rows: int = 0
+    start: float = float("inf")
+    end: float = float("-inf")
+    runs: List[RunEntry] = []
+
+
+class ArchiveIndex(BaseModel):
+    sources: Dict[str, str] = {}  # file name -> sha256
+    days: Dict[str, DayEntry] = {}
+
+
+def _encode(track: TrackArrays) -> Dict[str, np.ndarray]:
+    return {
+        "time": np.rint(track.time * 1000).astype(COLUMNS["time"]),
+        "lat": np.rint(track.lat * COORD_SCALE).astype(COLUMNS["lat"]),
+        "lon": np.rint(track.lon * COORD_SCALE).astype(COLUMNS["lon"]),
+        "ele": track.ele.astype(COLUMNS["ele"]),
+    }
+
+
+def _decode(columns: Dict[str, np.ndarray]) -> TrackArrays:
+    return TrackArrays(
+        time=columns["time"].astype(float) / 1000,
+        lat=columns["lat"].astype(float) / COORD_SCALE,
+        lon=columns["lon"].astype(float) / COORD_SCALE,
+        ele=columns["ele"].astype(float),
+    )
+
+
+def _segment_arrays(segment) -> tuple[TrackArrays, float]:
+    """Convert a gpxpy segment into arrays plus its UTC offset in seconds."""
+    points = [p for p in segment.points if p.time is not None]
+    offset = 0.0
+    if points:
+        first = points[0].time
+        if first.tzinfo is not None and first.utcoffset() is not None:
+            offset = first.utcoffset().total_seconds()
+
+    def _timestamp(t: datetime) -> float:
+        return (t if t.tzinfo else t.replace(tzinfo=timezone.utc)).timestamp()
+
+    track = TrackArrays(
+        time=np.array([_timestamp(p.time) for p in points], dtype=float),
+        lat=np.array([p.latitude for p in points], dtype=float),
+        lon=np.array([p.longitude for p in points], dtype=float),
+        ele=np.array(
+            [p.elevation if p.elevation is not None else 0.0 for p in points],
+            dtype=float,
+        ),
+    )
+    return track, offset
+
+
+class SeasonArchive:
+    """On-disk archive of many GPX recordings.
+
+    Every day is stored as a directory of columnar `.npy` chunks (one file per
+    column) and `index.json` keeps the time bounds of days and runs, so queries
+    only memory-map the chunks they need.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.index = self._load_index()
+
+    def _load_index(self) -> ArchiveIndex:
+        path = self.root / INDEX_FILE
+        if not path.exists():
+            return ArchiveIndex()
+        return ArchiveIndex.model_validate_json(path.read_text())
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / INDEX_FILE).write_text(self.index.model_dump_json(indent=1))
+
+    def _read_day(self, day: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+        return {
+            name: np.load(self.root / day / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in COLUMNS
+        }
+
+    def _write_day(self, day: str, columns: Dict[str, np.ndarray]):
+        day_dir = self.root / day
+        day_dir.mkdir(parents=True, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            np.save(day_dir / f"{name}.npy", np.ascontiguousarray(columns[name], dtype=dtype))
+
+    def _remove_source(self, source: str):
+        """Drop the rows and runs of `source` from every day holding some."""
+        for day in list(self.index.days):
+            day_entry = self.index.days[day]
+            if not any(entry.source == source for entry in day_entry.runs):
+                continue
+
+            columns = self._read_day(day, mmap=False)
+            kept = DayEntry()
+            parts: List[Dict[str, np.ndarray]] = []
+            for entry in day_entry.runs:
+                if entry.source == source:
+                    continue
+                parts.append(
+                    {name: col[entry.start_row : entry.stop_row] for name, col in columns.items()}
+                )
+                rows = entry.stop_row - entry.start_row
+                kept.runs.append(
+                    entry.model_copy(update={"start_row": kept.rows, "stop_row": kept.rows + rows})
+                )
+                kept.rows += rows
+                kept.start = min(kept.start, entry.start)
+                kept.end = max(kept.end, entry.end)
+
+            if not kept.runs:
+                for name in COLUMNS:
+                    (self.root / day / f"{name}.npy").unlink(missing_ok=True)
+                del self.index.days[day]
+                continue
+
+            self._write_day(
+                day, {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+            )
+            self.index.days[day] = kept
+
+        self.index.sources.pop(source, None)
+
+    def ingest(self, gpx_path: str | Path) -> int:
+        """Add a GPX file to the archive, return the number of stored points.
+
+        Files already ingested (same name and content) are skipped. A file
+        ingested again with a new content replaces the points of the old one.
+        """
+        gpx_path = Path(gpx_path)
+        digest = file_digest(gpx_path)
+        if self.index.sources.get(gpx_path.name) == digest:
+            logger.debug(f"Skipping already ingested file: {gpx_path}")
+            return 0
+
+        if gpx_path.name in self.index.sources:
+            logger.info(f"Content of {gpx_path.name} changed, replacing its points")
+            self._remove_source(gpx_path.name)
+
+        gpx = GPXData(gpx_path).gpx
+
+        # group segments per (local) day
+        new_runs: Dict[str, List[tuple[RunEntry, TrackArrays]]] = {}
+        for track_id, track in enumerate(gpx.tracks):
+            for segment_id, segment in enumerate(track.segments):
+                arrays, offset = _segment_arrays(segment)
+                if not len(arrays):
+                    continue
+
+                start, end = float(arrays.time[0]), float(arrays.time[-1])
+                day = (
+                    datetime.fromtimestamp(start, tz=timezone(timedelta(seconds=offset)))
+                    .date()
+                    .isoformat()
+                )
+                entry = RunEntry(
+                    source=gpx_path.name,
+                    track=track_id,
+                    segment=segment_id,
+                    start_row=0,
+                    stop_row=len(arrays),
+                    start=start,
+                    end=end,
+                    utc_offset=offset,
+                )
+                new_runs.setdefault(day, []).append((entry, arrays))
+
+        total = 0
+        for day, runs in new_runs.items():
+            day_entry = self.index.days.get(day, DayEntry())
+
+            parts: List[Dict[str, np.ndarray]] = []
+            if day_entry.rows:
+                parts.append(self._read_day(day, mmap=False))
+
+            row = day_entry.rows
+            for entry, arrays in runs:
+                entry.start_row, entry.stop_row = row, row + len(arrays)
+                row = entry.stop_row
+                day_entry.runs.append(entry)
+                day_entry.start = min(day_entry.start, entry.start)
+                day_entry.end = max(day_entry.end, entry.end)
+                parts.append(_encode(arrays))
+
+            self._write_day(
+                day, {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+            )
+            total += row - day_entry.rows
+            day_entry.rows = row
+            self.index.days[day] = day_entry
+
+        self.index.sources[gpx_path.name] = digest
+        self._save_index()
+        logger.info(f"Ingested {total} points from {gpx_path}")
+        return total
+
+    def days(self) -> List[str]:
+        return sorted(self.index.days)
+
+    def runs(self, day: str) -> List[RunEntry]:
+        if day not in self.index.days:
+            raise ValueError(f"Day {day} not in archive. Available days: {self.days()}")
+        return self.index.days[day].runs
+
+    def run(self, day: str, run_id: int) -> TrackArrays:
+        """Read a single run (GPX segment) of a day."""
+        runs = self.runs(day)
+        if run_id >= len(runs):
+            raise ValueError(f"run_id {run_id} out of range. Len runs: {len(runs)}")
+
+        entry = runs[run_id]
+        columns = self._read_day(day)
+        return _decode(
+            {name: col[entry.start_row : entry.stop_row] for name, col in columns.items()}
+        )
+
+    def tracks(self) -> Iterator[TrackArrays]:
+        """Every run of every day, in time order."""
+        for day in self.days():
+            for run_id in range(len(self.runs(day))):
+                yield self.run(day, run_id)
+
+    def query(self, start: datetime, end: datetime) -> TrackArrays:
+        """Read all points with start <= time <= end, sorted by time."""
+        t0, t1 = start.timestamp(), end.timestamp()
+
+        parts: List[TrackArrays] = []
+        for day in self.days():
+            day_entry = self.index.days[day]
+            if day_entry.end < t0 or day_entry.start > t1:
+                continue
+
+            columns = self._read_day(day)
+            t0_ms, t1_ms = int(np.floor(t0 * 1000)), int(np.ceil(t1 * 1000))
+            for entry in day_entry.runs:
+                if entry.end < t0 or entry.start > t1:
+                    continue
+
+                # runs are time sorted, only the matching rows are paged in
+                times = columns["time"][entry.start_row : entry.stop_row]
+                lo = entry.start_row + int(np.searchsorted(times, t0_ms, side="left"))
+                hi = entry.start_row + int(np.searchsorted(times, t1_ms, side="right"))
+                parts.append(_decode({name: col[lo:hi] for name, col in columns.items()}))
+
+        track = TrackArrays.concatenate(parts)
+        order = np.argsort(track.time, kind="stable")
+        return TrackArrays(
+            time=track.time[order],
+            lat=track.lat[order],
+            lon=track.lon[order],
+            ele=track.ele[order],
+        )
+
+    def collect_points(
+        self, start: datetime, end: datetime, tz: Optional[timezone] = None
+    ) -> List[Point]:
+        """`collect_points` equivalent for a time range of the archive."""
+        points = self.query(start, end).to_points(tz=tz or start.tzinfo or timezone.utc)
+        if not points:
+            raise ValueError(f"No track points found between {start} and {end}")
+        return points
+
+    def ingest_all(self, gpx_paths: Iterable[str | Path]) -> int:
+        return sum(self.ingest(path) for path in gpx_paths)
+
+
+def main():
+    args = build_ingest_parser().parse_args()
+    setup_logger(logging.DEBUG if args.verbose else logging.INFO)
+
+    archive = SeasonArchive(args.archive)
+    total = archive.ingest_all(args.gpx_files)
+    logger.info(f"Archive {args.archive}: {total} new points, {len(archive.days())} days")
+
+    if args.course:
+        # imported here, the archive does not depend on the FCPXML side otherwise
+        from ski.create_fcpxml import print_laps
+
+        course = Course(**load_course(Path(args.course)))
+        print_laps(season_laps(archive.tracks(), course))
+
+
+if __name__ == "__main__":
+    main()
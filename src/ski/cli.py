@@ -2,7 +2,7 @@ import argparse
 from pathlib import Path
 from typing import Optional
 
-from ski.config import AnimationSettings, SettingsFactory
+from ski.config import AnimationSettings, MinimapSettings, SettingsFactory
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -12,7 +12,7 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "gpx_file",
         nargs="?",
-        help="Path to the GPX file (can also be provided via --config)",
+        help="Path to the GPX (.gpx, .gpx.gz, .zip), CSV or .slopes file (can also be provided via --config)",
     )
     parser.add_argument(
         "--config",
@@ -57,6 +57,36 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Seconds between interpolated samples (when interpolation is enabled)",
     )
+    parser.add_argument(
+        "--rider",
+        dest="riders",
+        action="append",
+        default=None,
+        help="Additional GPX file of another rider, time aligned on its own lanes "
+        "(repeat for more riders)",
+    )
+    parser.add_argument(
+        "--max-gap",
+        dest="max_gap_s",
+        type=float,
+        default=None,
+        help="Seconds without a fix treated as a recording gap, not interpolated (default 60)",
+    )
+    parser.add_argument(
+        "--gap-mode",
+        dest="gap_mode",
+        choices=["hide", "hold"],
+        default=None,
+        help="Hide the titles during recording gaps or hold the last values",
+    )
+    parser.add_argument(
+        "--speed-mode",
+        dest="speed_mode",
+        choices=["dense", "raw"],
+        default=None,
+        help="Compute speed on the interpolated points (dense) or on the raw fixes, "
+        "resampling only the results (raw, faster)",
+    )
     parser.add_argument(
         "--duration",
         dest="duration",
@@ -64,6 +94,20 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Handful control to limit duration (in seconds) of produced file.",
     )
+    parser.add_argument(
+        "--start",
+        dest="start",
+        type=str,
+        default=None,
+        help="Start of the clip: ISO 8601 time or offset (seconds, MM:SS, HH:MM:SS) from the first point",
+    )
+    parser.add_argument(
+        "--end",
+        dest="end",
+        type=str,
+        default=None,
+        help="End of the clip: ISO 8601 time or offset (seconds, MM:SS, HH:MM:SS) from the first point",
+    )
     parser.add_argument(
         "-f",
         "--fps",
@@ -72,6 +116,116 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Frames per second",
     )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Number of worker processes used to write the output variants",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        type=int,
+        default=None,
+        help="Stream the track in chunks of <chunk_size> points (bounded memory)",
+    )
+    parser.add_argument(
+        "--shard-by",
+        dest="shard_by",
+        choices=["duration", "titles", "run"],
+        default=None,
+        help="Split the output into several projects of one event, by duration, title count or run",
+    )
+    parser.add_argument(
+        "--shard-size",
+        dest="shard_size",
+        type=float,
+        default=None,
+        help="Seconds (--shard-by duration) or titles (--shard-by titles) per shard",
+    )
+    parser.add_argument(
+        "--live",
+        dest="live",
+        action="store_true",
+        default=None,
+        help="Follow a GPX or NMEA recording that is still being written",
+    )
+    parser.add_argument(
+        "--poll",
+        dest="poll_s",
+        type=float,
+        default=None,
+        help="With --live, seconds between two reads of the recording",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        dest="idle_timeout_s",
+        type=float,
+        default=None,
+        help="With --live, stop after <idle_timeout> seconds without new data",
+    )
+    parser.add_argument(
+        "--dem",
+        dest="dem_dir",
+        type=str,
+        default=None,
+        help="Directory of SRTM .hgt tiles used to correct GPS elevation",
+    )
+    parser.add_argument(
+        "--runs-only",
+        dest="runs_only",
+        action="store_true",
+        default=None,
+        help="Detect runs/lifts/idle periods and only produce titles for runs",
+    )
+    parser.add_argument(
+        "--run",
+        dest="run",
+        type=int,
+        default=None,
+        help="Only produce titles for the detected run with id <run>",
+    )
+    parser.add_argument(
+        "--course",
+        dest="course",
+        type=str,
+        default=None,
+        help="YAML file with the start/finish (and split) gates of a timed course",
+    )
+    parser.add_argument(
+        "--list-laps",
+        dest="list_laps",
+        action="store_true",
+        help="Print the laps of --course found in the track and exit",
+    )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="Only predict titles per lane, output size, stage timings and memory",
+    )
+    parser.add_argument(
+        "--title-budget",
+        dest="title_budget",
+        type=int,
+        default=None,
+        help="With --dry-run, suggest settings that keep the title count under <title_budget>",
+    )
+    parser.add_argument(
+        "--force",
+        dest="force",
+        action="store_true",
+        default=None,
+        help="Rewrite outputs even when their content is unchanged",
+    )
+    parser.add_argument(
+        "--list-runs",
+        dest="list_runs",
+        action="store_true",
+        help="Print the detected runs, lifts and idle periods and exit",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -89,8 +243,162 @@ def build_settings(args: argparse.Namespace) -> AnimationSettings:
     cli_overrides = {
         key: value
         for key, value in vars(args).items()
-        if key not in {"config"} and value is not None
+        if key not in {"config", "list_runs", "list_laps", "dry_run", "title_budget"}
+        and value is not None
     }
 
     config_path = Path(args.config) if args.config else None
     return SettingsFactory.from_sources(cli_overrides, config_path)
+
+
+def build_minimap_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Render a minimap overlay (PNG sequence) of a GPX track"
+    )
+    parser.add_argument(
+        "gpx_file",
+        nargs="?",
+        help="Path to the GPX (.gpx, .gpx.gz, .zip), CSV or .slopes file (can also be provided via --config)",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        help="Path to YAML config file with minimap defaults",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        type=str,
+        default=None,
+        help="Output directory for the frames",
+    )
+    parser.add_argument(
+        "--track", type=int, default=None, help="Select track id <track>."
+    )
+    parser.add_argument(
+        "--segment",
+        type=int,
+        default=None,
+        help="Select the segment with id <segment> from track <track>.",
+    )
+    parser.add_argument(
+        "--width", dest="width", type=int, default=None, help="Frame width in pixels"
+    )
+    parser.add_argument(
+        "--height", dest="height", type=int, default=None, help="Frame height in pixels"
+    )
+    parser.add_argument(
+        "--tolerance",
+        dest="tolerance",
+        type=float,
+        default=None,
+        help="Line simplification tolerance in pixels",
+    )
+    parser.add_argument(
+        "--trail",
+        dest="trail",
+        type=float,
+        default=None,
+        help="Seconds of trail drawn behind the marker (0 disables it)",
+    )
+    parser.add_argument(
+        "--duration",
+        dest="duration",
+        type=float,
+        default=None,
+        help="Handful control to limit duration (in seconds) of produced frames.",
+    )
+    parser.add_argument(
+        "-f",
+        "--fps",
+        dest="fps",
+        type=int,
+        default=None,
+        help="Frames per second",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the CPU count)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action='store_true',
+        help="Increase output verbosity."
+    )
+    return parser
+
+
+def build_minimap_settings(args: argparse.Namespace) -> MinimapSettings:
+    cli_overrides = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"config", "verbose"} and value is not None
+    }
+
+    config_path = Path(args.config) if args.config else None
+    return SettingsFactory.minimap_from_sources(cli_overrides, config_path)
+
+
+def build_ingest_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Ingest GPX files into a season archive"
+    )
+    parser.add_argument("archive", help="Archive directory (created if missing)")
+    parser.add_argument("gpx_files", nargs="*", help="GPX files to ingest")
+    parser.add_argument(
+        "--course",
+        dest="course",
+        type=str,
+        default=None,
+        help="YAML course file, print its laps over the whole archive",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action='store_true',
+        help="Increase output verbosity."
+    )
+    return parser
+
+
+def build_service_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Serve overlay generation over HTTP"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8765, help="Bind port")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the CPU count)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        dest="cache_size",
+        type=int,
+        default=32,
+        help="Parsed tracks (per worker) and results kept in memory/disk",
+    )
+    parser.add_argument(
+        "--work-dir",
+        dest="work_dir",
+        type=str,
+        default=None,
+        help="Directory for uploads and results (defaults to a temp dir)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action='store_true',
+        help="Increase output verbosity."
+    )
+    return parser
@@ -1,11 +1,50 @@
 from __future__ import annotations
 
+import hashlib
+import json
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel
 import yaml
 
+from ski.gpx.gates import Course
+from ski.gpx.model import TimeWindow
+from ski.utils import file_digest, parse_time_bound
+
+# settings that change where or how outputs are written, not their content
+OUTPUT_ONLY_FIELDS = {
+    "gpx_file",
+    "output",
+    "outputs",
+    "workers",
+    "chunk_size",
+    "force",
+    "live",
+    "poll_s",
+    "idle_timeout_s",
+}
+
+
+class OutputVariant(BaseModel):
+    """One output of a render, unset fields fall back to the top level settings."""
+
+    output: str
+    template: Optional[str] = None
+    duration: Optional[int] = None
+    fps: Optional[int] = None
+
+
+class Rider(BaseModel):
+    """An additional input of a multi-rider project."""
+
+    gpx_file: Path
+    name: Optional[str] = None  # prefixed to the rider's titles
+    track: Optional[int] = None
+    segment: Optional[int] = None
+    clock_offset_s: float = 0.0  # added to the rider's timestamps
+
 
 class AnimationSettings(BaseModel):
     gpx_file: Path
@@ -15,11 +54,108 @@ class AnimationSettings(BaseModel):
     template: str = "default"
     interpolate: bool = True
     interpolation_step: float = 0.25
+    # "dense": speed on the interpolated points, "raw": on the fixes, then resampled
+    speed_mode: Literal["dense", "raw"] = "dense"
+    # fixes further apart are a recording gap: never interpolated, titles hidden or held
+    max_gap_s: Optional[float] = 60.0
+    gap_mode: Literal["hide", "hold"] = "hide"
     duration: Optional[int] = None
+    start: Optional[str | float | datetime] = None
+    end: Optional[str | float | datetime] = None
     fps: int = 30
+    outputs: List[OutputVariant] = []
+    workers: int = 1
+    chunk_size: Optional[int] = None
+    dem_dir: Optional[Path] = None
+    runs_only: bool = False
+    run: Optional[int] = None
+    force: bool = False
+    course: Optional[Course] = None
+    riders: List[Rider] = []
+    # follow a recording that is still being written
+    live: bool = False
+    poll_s: float = 0.5
+    idle_timeout_s: Optional[float] = None
+    # split the output into projects of `shard_size` seconds / titles, or one per run
+    shard_by: Optional[Literal["duration", "titles", "run"]] = None
+    shard_size: Optional[float] = None
 
+    def fingerprint(self, source_digest: Optional[str] = None) -> str:
+        """Hash of the input content and of the settings shaping the output.
 
-def _load_config(config_path: Optional[Path]) -> Dict[str, Any]:
+        Seeds the FCPXML UIDs, so the same input and settings always produce
+        the same bytes. `source_digest` replaces hashing `gpx_file`.
+        """
+        if source_digest is None:
+            source_digest = file_digest(self.gpx_file)
+        digests = [source_digest, *(file_digest(r.gpx_file) for r in self.riders)]
+
+        exclude: Dict[str, Any] = {name: True for name in OUTPUT_ONLY_FIELDS}
+        exclude["riders"] = {"__all__": {"gpx_file"}}
+        fields = self.model_dump(mode="json", exclude=exclude)
+        payload = json.dumps(fields, sort_keys=True, default=str)
+        return hashlib.sha256(f"{' '.join(digests)}\n{payload}".encode()).hexdigest()
+
+    def window(self, margin: float = 0.0) -> Optional[TimeWindow]:
+        """Time window to push down to the reader, None to read everything.
+
+        Without `end`, the longest output duration bounds the window.
+        """
+        start = parse_time_bound(self.start) if self.start is not None else None
+        end = parse_time_bound(self.end) if self.end is not None else None
+
+        durations = [v.duration for v in self.variants()]
+        if end is None and durations and all(d is not None for d in durations):
+            end = (start or timedelta()) + timedelta(seconds=max(durations))  # type: ignore
+
+        if start is None and end is None:
+            return None
+
+        return TimeWindow(start=start, end=end, margin=margin)
+
+    def variants(self) -> List[OutputVariant]:
+        """Resolved output variants, the top level output when none is listed."""
+        if not self.outputs:
+            return [
+                OutputVariant(
+                    output=self.output,
+                    template=self.template,
+                    duration=self.duration,
+                    fps=self.fps,
+                )
+            ]
+
+        return [
+            OutputVariant(
+                output=v.output,
+                template=v.template or self.template,
+                duration=v.duration if v.duration is not None else self.duration,
+                fps=v.fps or self.fps,
+            )
+            for v in self.outputs
+        ]
+
+
+class MinimapSettings(BaseModel):
+    gpx_file: Path
+    output: str = "minimap"
+    track: Optional[int] = None
+    segment: Optional[int] = None
+    width: int = 480
+    height: int = 480
+    padding: int = 24
+    tolerance: float = 1.0
+    line_width: int = 3
+    marker_radius: int = 8
+    trail: float = 10.0
+    duration: Optional[int] = None
+    fps: int = 30
+    workers: Optional[int] = None
+
+
+def _load_config(
+    config_path: Optional[Path], model: type[BaseModel] = AnimationSettings
+) -> Dict[str, Any]:
     """Load YAML configuration if provided"""
     if not config_path:
         return {}
@@ -30,7 +166,16 @@ def _load_config(config_path: Optional[Path]) -> Dict[str, Any]:
     with open(config_path, "r") as f:
         data = yaml.safe_load(f) or {}
 
-    return {k: v for k, v in data.items() if k in AnimationSettings.model_fields.keys()}
+    return {k: v for k, v in data.items() if k in model.model_fields.keys()}
+
+
+def load_course(course_path: Path) -> Dict[str, Any]:
+    """Load a course (start/finish/split gates) from its own YAML file."""
+    if not course_path.exists():
+        raise FileNotFoundError(f"Course file not found: {course_path}")
+
+    with open(course_path, "r") as f:
+        return yaml.safe_load(f) or {}
 
 
 class SettingsFactory:
@@ -50,4 +195,28 @@ class SettingsFactory:
         merged["interpolate"] = bool(merged.get("interpolate"))
         # merged["interpolation_step"] = float(merged["interpolation_step"])
 
+        merged["riders"] = [
+            {"gpx_file": r} if isinstance(r, (str, Path)) else r
+            for r in merged.get("riders") or []
+        ]
+
+        if isinstance(merged.get("course"), (str, Path)):
+            merged["course"] = load_course(Path(merged["course"]))
+
         return AnimationSettings(**merged)
+
+    @staticmethod
+    def minimap_from_sources(
+        cli_overrides: Dict[str, Any], config_path: Optional[Path]
+    ) -> MinimapSettings:
+        """Build minimap settings from YAML config and CLI overrides."""
+        file_config = _load_config(config_path, MinimapSettings)
+
+        merged: Dict[str, Any] = {**file_config, **cli_overrides}
+
+        if not merged.get("gpx_file"):
+            raise ValueError("GPX file path is required (provide via CLI or config). Run with -h.")
+
+        merged["gpx_file"] = Path(merged["gpx_file"])
+
+        return MinimapSettings(**merged)
@@ -1,26 +1,41 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
 import logging
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from ski.cli import build_settings, parse_args
-from ski.config import AnimationSettings
+from ski.config import AnimationSettings, OutputVariant
 from ski.fcp import TitleShape
 from ski.fcp.final_cut_pro import generate_xml
 from ski.gpx import (
     GPXData,
+    Lap,
+    Point,
     SpeedPoint,
+    TrackArrays,
+    apply_laps,
     calculate_speed,
-    collect_points,
+    course_laps,
+    correct_elevation,
     interpolate_distances,
+    load_dem,
+    load_points,
+    mark_gaps,
+    parse_source,
+    points_from_source,
+    resample_speed,
+    runs,
+    segment_track,
 )
 from ski.logger import get_logger, setup_logger
 from ski.resources.templates import TemplateRegistry
-from ski.utils import FileWriter
+from ski.utils import FileWriter, format_elapsed
 
 logger = get_logger()
 
-def _create_titles(
+def create_titles(
     points: List[SpeedPoint],
     template: str,
     initial_time: datetime | None = None,
@@ -58,33 +73,262 @@ def _create_titles(
     return titles
 
 
-def create_fcpxml(settings: AnimationSettings):
-    gpx_file = GPXData(settings.gpx_file)
-    raw_points = collect_points(
-        gpx=gpx_file.gpx, track_id=settings.track, segment_id=settings.segment
+SMOOTH_WINDOW = 25
+
+
+def select_runs(points: List[Point], run: int | None = None) -> List[List[Point]]:
+    """Split points into detected runs, only the run with id `run` if given."""
+    activities = runs(segment_track(TrackArrays.from_points(points)))
+    if run is not None:
+        if run >= len(activities):
+            raise ValueError(f"run {run} out of range. Len runs: {len(activities)}")
+        activities = [activities[run]]
+
+    if not activities:
+        raise ValueError("No runs detected")
+
+    logger.debug(f"Selected {len(activities)} runs")
+    return [points[a.start_idx : a.stop_idx] for a in activities]
+
+
+def list_runs(settings: AnimationSettings):
+    points = load_points(settings.gpx_file, track_id=settings.track, segment_id=settings.segment)
+    if settings.dem_dir is not None:
+        points = correct_elevation(points, load_dem(str(settings.dem_dir)))
+
+    run_id = 0
+    for activity in segment_track(TrackArrays.from_points(points)):
+        label = f"run {run_id}" if activity.type == "run" else activity.type
+        run_id += activity.type == "run"
+        print(
+            f"{label:<8} {activity.start:%H:%M:%S} - {activity.end:%H:%M:%S}"
+            f"  {activity.duration_s:7.0f} s  {activity.distance_m:7.0f} m"
+            f"  {activity.vertical_drop_m:5.0f} m vert  {activity.max_speed_kmh:5.1f} km/h max"
+        )
+
+
+def print_laps(laps: List[Lap]):
+    for lap_id, lap in enumerate(laps):
+        start = datetime.fromtimestamp(lap.start, tz=timezone.utc)
+        splits = "  ".join(format_elapsed(s) for s in lap.splits)
+        print(
+            f"lap {lap_id:<4} {lap.course} {start:%Y-%m-%d %H:%M:%S}"
+            f"  {format_elapsed(lap.duration):>8}  {splits}"
+        )
+
+
+def list_laps(settings: AnimationSettings):
+    if settings.course is None:
+        raise ValueError("--list-laps needs a --course")
+
+    points = load_points(settings.gpx_file, track_id=settings.track, segment_id=settings.segment)
+    print_laps(course_laps(TrackArrays.from_points(points), settings.course))
+
+
+def prepare_points(
+    settings: AnimationSettings, source: GPXData | TrackArrays | None = None
+) -> List[SpeedPoint]:
+    """Parse, interpolate and compute speed, shared by every output variant.
+
+    With --start/--end/--duration only the points inside the window (plus
+    the smoothing margin) are read and processed. An already parsed `source`
+    replaces reading `settings.gpx_file`.
+    """
+    sample_spacing = settings.interpolation_step if settings.interpolate else 2.0
+    window = settings.window(margin=(SMOOTH_WINDOW // 2 + 1) * sample_spacing)
+
+    if source is None:
+        source = parse_source(settings.gpx_file)
+
+    raw_points = points_from_source(
+        source,
+        track_id=settings.track,
+        segment_id=settings.segment,
+        window=window,
     )
 
+    if settings.dem_dir is not None:
+        # correct the raw fixes, interpolation then carries the DEM elevation
+        raw_points = correct_elevation(raw_points, load_dem(str(settings.dem_dir)))
+
+    laps = []
+    if settings.course is not None:
+        # crossings are found on the raw fixes, then carried to the output samples
+        laps = course_laps(TrackArrays.from_points(raw_points), settings.course)
+        logger.debug(f"Course {settings.course.name}: {len(laps)} laps")
+
+    groups = [raw_points]
+    if settings.runs_only or settings.run is not None:
+        groups = select_runs(raw_points, settings.run)
+
     if settings.interpolate:
         logger.debug(f"Interpolation with step: {settings.interpolation_step}")
-        raw_points = interpolate_distances(raw_points, step_seconds=settings.interpolation_step)
 
-    points = calculate_speed(raw_points, smooth_window=25)
+    # each run is processed on its own, nothing is interpolated across the gaps
+    points: List[SpeedPoint] = []
+    for group in groups:
+        if settings.speed_mode == "raw":
+            # same smoothing span as SMOOTH_WINDOW samples of the dense grid
+            step = settings.interpolation_step if settings.interpolate else None
+            points.extend(
+                resample_speed(
+                    group,
+                    step_seconds=step,
+                    smooth_s=SMOOTH_WINDOW * sample_spacing,
+                    max_gap_s=settings.max_gap_s,
+                )
+            )
+            continue
+
+        if settings.interpolate:
+            group = interpolate_distances(
+                group, step_seconds=settings.interpolation_step, max_gap_s=settings.max_gap_s
+            )
+        points.extend(
+            calculate_speed(group, smooth_window=SMOOTH_WINDOW, max_gap_s=settings.max_gap_s)
+        )
+
+    if settings.gap_mode == "hide":
+        mark_gaps(points, settings.max_gap_s)
+
+    if laps:
+        apply_laps(points, laps)
 
-    titles = _create_titles(points=points, template=settings.template)
+    if window is not None:
+        # drop the smoothing margin
+        points = [p for p in points if window.contains(p.time, margin=False)]
+        if not points:
+            raise ValueError(f"No track points found between {window.start_time} and {window.end_time}")
+        logger.debug(f"Window {window.start_time} - {window.end_time}: {len(points)} points")
 
-    duration = timedelta(seconds=settings.duration) if settings.duration else None
+    return points
 
-    project_title = Path(settings.output).stem
 
-    xml = generate_xml(
+def render_titles(
+    titles: List[TitleShape],
+    elements: List[TitleShape],
+    variant: OutputVariant,
+    uid_seed: str | None = None,
+    mod_date: datetime | None = None,
+    event_name: str | None = None,
+) -> str:
+    duration = timedelta(seconds=variant.duration) if variant.duration else None
+
+    return generate_xml(
         titles=titles,
-        fps=settings.fps,
-        project_title=project_title,
+        fps=variant.fps,  # type: ignore
+        project_title=Path(variant.output).stem,
         duration=duration,
+        elements=elements,
+        uid_seed=uid_seed,
+        mod_date=mod_date,
+        event_name=event_name,
     )
 
-    FileWriter.write(settings.output, xml)
-    logger.info(f"File saved at: {settings.output}")
+
+def render_xml(
+    points: List[SpeedPoint], variant: OutputVariant, uid_seed: str | None = None
+) -> str:
+    """Apply the template of a resolved variant and build its XML."""
+    titles = create_titles(points=points, template=variant.template)  # type: ignore
+    elements = TemplateRegistry.elements(points, template=variant.template)  # type: ignore
+    return render_titles(titles, elements, variant, uid_seed, points[0].time)
+
+
+def write_variants(
+    points: List[SpeedPoint],
+    template: str,
+    variants: List[OutputVariant],
+    uid_seed: str | None = None,
+    force: bool = False,
+    event_name: str | None = None,
+) -> List[str]:
+    """Apply `template` once and write every variant using it.
+
+    Outputs whose content did not change are not rewritten unless `force`.
+    """
+    titles = create_titles(points=points, template=template)
+    elements = TemplateRegistry.elements(points, template=template)
+
+    for variant in variants:
+        xml = render_titles(titles, elements, variant, uid_seed, points[0].time, event_name)
+        if FileWriter.write(variant.output, xml, skip_unchanged=not force):
+            logger.info(f"File saved at: {variant.output}")
+        else:
+            logger.info(f"Unchanged, skipped: {variant.output}")
+
+    return [v.output for v in variants]
+
+
+# points shared by the worker processes, set once per worker by `_init_worker`
+_worker_points: List[SpeedPoint] = []
+
+
+def _init_worker(points: List[SpeedPoint]):
+    _worker_points[:] = points
+
+
+def _write_variants_worker(
+    template: str, variants: List[OutputVariant], uid_seed: str, force: bool
+) -> List[str]:
+    return write_variants(_worker_points, template, variants, uid_seed, force)
+
+
+def create_fcpxml(settings: AnimationSettings):
+    if settings.shard_by is not None:
+        # imported here, sharding builds on this module
+        from ski.shards import create_sharded
+
+        create_sharded(settings)
+        return
+
+    if settings.live:
+        # imported here, live mode builds on the pipeline
+        from ski.live import live_fcpxml
+
+        live_fcpxml(settings, smooth_window=SMOOTH_WINDOW)
+        return
+
+    if settings.riders:
+        # imported here, multi-rider projects build on this module
+        from ski.riders import create_multi_rider
+
+        create_multi_rider(settings)
+        return
+
+    if settings.chunk_size:
+        # imported here, the pipeline depends on this module's settings only
+        from ski.pipeline import stream_fcpxml
+
+        stream_fcpxml(settings, smooth_window=SMOOTH_WINDOW)
+        return
+
+    points = prepare_points(settings)
+    uid_seed = settings.fingerprint()
+
+    # variants sharing a template also share its titles
+    per_template: Dict[str, List[OutputVariant]] = {}
+    for variant in settings.variants():
+        per_template.setdefault(variant.template, []).append(variant)  # type: ignore
+
+    workers = min(settings.workers, len(per_template))
+    if workers <= 1:
+        for template, variants in per_template.items():
+            write_variants(points, template, variants, uid_seed, settings.force)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(points,)
+    ) as pool:
+        list(
+            pool.map(
+                _write_variants_worker,
+                per_template.keys(),
+                per_template.values(),
+                repeat(uid_seed),
+                repeat(settings.force),
+            )
+        )
 
 
 def main():
@@ -97,6 +341,21 @@ def main():
         logger.error(f"{exc}")
         return
 
+    if args.list_runs:
+        list_runs(settings=settings)
+        return
+
+    if args.list_laps:
+        list_laps(settings=settings)
+        return
+
+    if args.dry_run:
+        # imported here, the estimator builds on this module
+        from ski.estimate import dry_run
+
+        dry_run(settings=settings, title_budget=args.title_budget)
+        return
+
     create_fcpxml(settings=settings)
 
 
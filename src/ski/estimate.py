@@ -0,0 +1,387 @@
+"""`--dry-run`: predict what `create_fcpxml` would produce, and its cost.
+
+Only the input is read in full. The output sample count comes from the
+interpolation grid (`gap_grid`) of the selection (the runs with --runs-only),
+everything else is measured on a few short windows spread over the selection
+and scaled to the whole of it:
+
+    parse -> select runs -> grid size -> windows: speed, titles, merge, XML -> extrapolate
+"""
+
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from ski.config import AnimationSettings
+from ski.create_fcpxml import (
+    SMOOTH_WINDOW,
+    create_titles,
+    prepare_points,
+    render_titles,
+    select_runs,
+)
+from ski.fcp import TitleShape
+from ski.fcp.final_cut_pro import merge_titles
+from ski.gpx import SpeedPoint, TrackArrays, gap_grid, parse_source, points_from_source, segment_track
+from ski.resources.templates import TemplateRegistry
+from ski.utils import time_to_seconds
+
+# interpolation steps tried when looking for settings that fit a title budget
+CANDIDATE_STEPS = (0.25, 0.5, 1.0, 2.0, 5.0)
+
+# the sample is split in this many windows spread over the selection
+SAMPLE_WINDOWS = 6
+
+
+class Estimate(BaseModel):
+    raw_points: int
+    output_points: int
+    sample_points: int
+    titles_per_lane: Dict[int, int]
+    elements: int
+    output_bytes: int
+    stage_seconds: Dict[str, float]  # parse is measured, the rest extrapolated
+    peak_memory_bytes: int
+    titles_per_step: Dict[float, int] = {}
+    suggestions: List[str] = []
+
+    @property
+    def titles(self) -> int:
+        return sum(self.titles_per_lane.values()) + self.elements
+
+    def report(self) -> str:
+        lines = [
+            f"points: {self.raw_points} recorded, {self.output_points} after interpolation"
+            f" (sampled {self.sample_points})",
+            "titles after merge: "
+            + ", ".join(f"lane {lane}: {n}" for lane, n in sorted(self.titles_per_lane.items()))
+            + (f", {self.elements} keyframed elements" if self.elements else "")
+            + f" (total {self.titles})",
+            f"output: ~{_size(self.output_bytes)}",
+            "stages: " + ", ".join(f"{k} {v:.2f} s" for k, v in self.stage_seconds.items()),
+            f"peak memory: ~{_size(self.peak_memory_bytes)}",
+        ]
+        if self.titles_per_step:
+            lines.append(
+                "titles per interpolation step: "
+                + ", ".join(f"{s:g} s: {n}" for s, n in self.titles_per_step.items())
+            )
+        lines.extend(f"suggestion: {s}" for s in self.suggestions)
+        return "\n".join(lines)
+
+
+def _size(n: float) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _peak_rss() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _grid_size(groups: List[TrackArrays], settings: AnimationSettings, step: float) -> int:
+    """Number of output samples for `step`, exactly as the interpolation builds them.
+
+    Every group (run) is interpolated on its own, as in `prepare_points`.
+    """
+    size = 0
+    for group in groups:
+        t = group.time
+        if len(t) < 2 or not settings.interpolate:
+            size += len(t)
+        else:
+            size += len(gap_grid(t - t[0], step, settings.max_gap_s))
+    durations = [v.duration for v in settings.variants()]
+    if durations and all(d is not None for d in durations):
+        size = min(size, int(max(durations) / step) + 1)  # type: ignore
+    return size
+
+
+def _sample_settings(settings: AnimationSettings, step: float) -> AnimationSettings:
+    # the sample is already selected and windowed, run detection is
+    # meaningless on a few minutes of it
+    return settings.model_copy(
+        update={
+            "start": None,
+            "end": None,
+            "duration": None,
+            "outputs": [],
+            "runs_only": False,
+            "run": None,
+            "riders": [],
+            "track": None,
+            "segment": None,
+            "interpolation_step": step,
+        }
+    )
+
+
+def _selection(settings: AnimationSettings, raw: list) -> List[TrackArrays]:
+    """The parts of the track that produce titles, the runs with --runs-only/--run."""
+    if settings.runs_only or settings.run is not None:
+        return [TrackArrays.from_points(group) for group in select_runs(raw, settings.run)]
+    return [TrackArrays.from_points(raw)]
+
+
+def _duration(groups: List[TrackArrays]) -> float:
+    return float(sum(g.time[-1] - g.time[0] for g in groups if len(g) >= 2))
+
+
+# a window of the selection: the points around it (with the smoothing
+# margin) and the start and end of the window itself (POSIX seconds)
+Window = tuple[TrackArrays, float, float]
+
+
+def _sample_windows(
+    parts: List[tuple[TrackArrays, TrackArrays]],
+    sample_seconds: float,
+    count: int = SAMPLE_WINDOWS,
+    margin: float = 0.0,
+) -> List[Window]:
+    """`count` windows of `sample_seconds / count` evenly spread over the parts.
+
+    `parts` are (group, part of the group) pairs, positions are taken on the
+    time covered by the parts, the gaps between them excluded. Every window
+    keeps `margin` seconds of its group around it, so it is smoothed as in
+    the whole track. Parts shorter than `sample_seconds` are the sample.
+    """
+    parts = [(group, part) for group, part in parts if len(part) >= 2]
+    durations = np.array([part.time[-1] - part.time[0] for _, part in parts])
+    total = float(durations.sum())
+
+    if total <= sample_seconds:
+        bounds = [(i, part.time[0], part.time[-1]) for i, (_, part) in enumerate(parts)]
+    else:
+        length = sample_seconds / count
+        ends = np.cumsum(durations)
+        bounds = []
+        for k in range(count):
+            # start of the k-th window in selected time, then in its part
+            position = (k + 0.5) * total / count - length / 2
+            i = min(int(np.searchsorted(ends, position, side="right")), len(parts) - 1)
+            part = parts[i][1]
+            start = part.time[0] + max(position - (ends[i] - durations[i]), 0.0)
+            bounds.append((i, start, min(start + length, part.time[-1])))
+
+    windows = []
+    for i, start, end in bounds:
+        group = parts[i][0]
+        # one more fix on each side, the margin is shorter than sparse fix intervals
+        lo = max(int(np.searchsorted(group.time, start - margin, side="left")) - 1, 0)
+        hi = min(int(np.searchsorted(group.time, end + margin, side="right")) + 1, len(group))
+        windows.append((group.slice(lo, hi), float(start), float(end)))
+    return windows
+
+
+def _weighted_samples(
+    groups: List[TrackArrays], sample_seconds: float, margin: float
+) -> List[tuple[Window, float]]:
+    """Sample windows with the share of the selection each one stands for.
+
+    Runs, lifts and idle periods produce titles at very different rates, the
+    selection is split by activity and every activity sampled in proportion
+    to its time (at least two windows each), so a periodic day can not put
+    every window on the same kind of activity.
+    """
+    strata: Dict[str, List[tuple[TrackArrays, TrackArrays]]] = {}
+    for group in groups:
+        for activity in segment_track(group):
+            if activity.stop_idx - activity.start_idx >= 2:
+                part = group.slice(activity.start_idx, activity.stop_idx)
+                strata.setdefault(activity.type, []).append((group, part))
+
+    total = _duration([part for parts in strata.values() for _, part in parts])
+    samples = []
+    for parts in strata.values():
+        duration = _duration([part for _, part in parts])
+        count = max(2, int(round(SAMPLE_WINDOWS * duration / total))) if total > 0 else 1
+        windows = _sample_windows(parts, sample_seconds * count / SAMPLE_WINDOWS, count, margin)
+        sampled = sum(end - start for _, start, end in windows)
+        weight = duration / sampled if sampled > 0 else 0.0
+        samples.extend((window, weight) for window in windows)
+    return samples
+
+
+def _sample_points(window: Window, settings: AnimationSettings, step: float) -> List[SpeedPoint]:
+    """Output points of a window and of its margin, smoothed as in the whole track."""
+    return prepare_points(_sample_settings(settings, step), source=window[0])
+
+
+def _inside(
+    titles: List[TitleShape], points: List[SpeedPoint], window: Window
+) -> List[TitleShape]:
+    """Titles starting inside the window, exactly the ones the whole track has there.
+
+    Titles starting in the margin belong to the neighbouring windows.
+    """
+    _, start, end = window
+    origin = points[0].time.timestamp()
+    return [t for t in titles if start <= origin + time_to_seconds(t.start_time) < end]
+
+
+def _sample_titles(
+    samples: List[tuple[Window, float]], settings: AnimationSettings, step: float
+) -> int:
+    """Merged titles of the whole selection with `step`, from the weighted samples."""
+    titles = 0.0
+    for window, weight in samples:
+        points = _sample_points(window, settings, step)
+        merged = merge_titles(
+            create_titles(points, template=settings.variants()[0].template)  # type: ignore
+        )
+        titles += len(_inside(merged, points, window)) * weight
+    return int(round(titles))
+
+
+def estimate(
+    settings: AnimationSettings,
+    sample_seconds: float = 300.0,
+    title_budget: Optional[int] = None,
+) -> Estimate:
+    """Predict titles, output size, stage timings and memory of `create_fcpxml`."""
+    variant = settings.variants()[0]
+    stages: Dict[str, float] = {}
+
+    started = time.perf_counter()
+    source = parse_source(settings.gpx_file)
+    raw = points_from_source(
+        source,
+        track_id=settings.track,
+        segment_id=settings.segment,
+        window=settings.window(),
+    )
+    stages["parse"] = time.perf_counter() - started
+    parse_rss = _peak_rss()
+
+    groups = _selection(settings, raw)
+    step = settings.interpolation_step
+    output_points = _grid_size(groups, settings, step)
+
+    # a few windows of every activity stand for the whole selection
+    sample_spacing = step if settings.interpolate else 2.0
+    margin = (SMOOTH_WINDOW // 2 + 1) * sample_spacing
+    samples = _weighted_samples(groups, sample_seconds, margin)
+
+    stages.update(speed=0.0, titles=0.0, xml=0.0)
+    per_lane: Dict[int, float] = {}
+    sample_points = 0
+    elements: List = []
+    body = 0.0
+    empty = len(render_titles([], [], variant.model_copy(update={"duration": None})).encode())
+    for window, weight in samples:
+        started = time.perf_counter()
+        points = _sample_points(window, settings, step)
+        stages["speed"] += (time.perf_counter() - started) * weight
+        _, start, end = window
+        sample_points += sum(start <= p.time.timestamp() < end for p in points)
+
+        started = time.perf_counter()
+        titles = create_titles(points, template=variant.template)  # type: ignore
+        merged = merge_titles(titles)
+        stages["titles"] += (time.perf_counter() - started) * weight
+        inside = _inside(merged, points, window)
+        for title in inside:
+            per_lane[title.lane] = per_lane.get(title.lane, 0) + weight
+        # keyframed elements: as many as on one window, their keyframes scale
+        window_elements = TemplateRegistry.elements(points, template=variant.template)  # type: ignore
+        elements = elements or window_elements
+
+        started = time.perf_counter()
+        xml = render_titles(
+            titles, window_elements, variant.model_copy(update={"duration": None})
+        )
+        stages["xml"] += (time.perf_counter() - started) * weight
+        # header and footer once, the title lines scale with the titles inside
+        body += (len(xml.encode()) - empty) * len(inside) / max(len(merged), 1) * weight
+
+    # tracing slows everything down, memory gets its own pass on the largest window
+    largest = max((window for window, _ in samples), key=lambda w: len(w[0]))
+    tracemalloc.start()
+    traced = _sample_points(largest, settings, step)
+    render_titles(
+        create_titles(traced, template=variant.template),  # type: ignore
+        TemplateRegistry.elements(traced, template=variant.template),  # type: ignore
+        variant.model_copy(update={"duration": None}),
+    )
+    _, sample_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory_ratio = output_points / max(len(traced), 1)
+
+    titles_per_lane = {lane: int(round(n)) for lane, n in per_lane.items()}
+    output_bytes = empty + int(body)
+
+    result = Estimate(
+        raw_points=len(raw),
+        output_points=output_points,
+        sample_points=sample_points,
+        titles_per_lane=titles_per_lane,
+        elements=len(elements),
+        output_bytes=output_bytes,
+        stage_seconds=stages,
+        peak_memory_bytes=parse_rss + int(sample_peak * memory_ratio),
+    )
+    result.suggestions = _suggest(result, settings, samples, title_budget)
+    return result
+
+
+def _suggest(
+    result: Estimate,
+    settings: AnimationSettings,
+    samples: List[tuple[Window, float]],
+    title_budget: Optional[int],
+) -> List[str]:
+    fps = settings.variants()[0].fps or settings.fps
+    step = settings.interpolation_step
+    suggestions = []
+
+    if settings.interpolate and step * fps < 1:
+        suggestions.append(
+            f"interpolation_step {step:g} s is shorter than a frame at {fps} fps, titles "
+            f"collapse onto the same frames: use interpolation_step >= {1 / fps:.3g} "
+            f"or fps >= {int(np.ceil(1 / step))}"
+        )
+
+    if title_budget is None or result.titles <= title_budget:
+        return suggestions
+
+    if not settings.interpolate:
+        suggestions.append(
+            f"{result.titles} titles exceed the budget of {title_budget}, "
+            "shorten the selection (--start/--end/--duration)"
+        )
+        return suggestions
+
+    for candidate in sorted({step, *CANDIDATE_STEPS}):
+        if candidate < step:
+            continue
+        result.titles_per_step[candidate] = (
+            _sample_titles(samples, settings, candidate) + result.elements
+        )
+
+    fitting = [s for s, n in result.titles_per_step.items() if n <= title_budget]
+    if fitting:
+        best = min(fitting)
+        suggestion = f"interpolation_step {best:g} gives ~{result.titles_per_step[best]} titles"
+        if best * fps < 1:
+            suggestion += f", with fps >= {int(np.ceil(1 / best))}"
+        suggestions.append(suggestion + f" (budget {title_budget})")
+    else:
+        suggestions.append(
+            f"no interpolation step fits the budget of {title_budget} titles, "
+            "shorten the selection (--start/--end/--duration) or disable interpolation"
+        )
+    return suggestions
+
+
+def dry_run(settings: AnimationSettings, title_budget: Optional[int] = None):
+    print(estimate(settings, title_budget=title_budget).report())
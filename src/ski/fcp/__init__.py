@@ -1,4 +1,13 @@
-from .model import RGBAColor, ShadowOffset, ShadowProperties, FontStyle, TitleShape
+from .model import (
+    RGBAColor,
+    ShadowOffset,
+    ShadowProperties,
+    FontStyle,
+    TitleShape,
+    Keyframe,
+    KeyframedTitle,
+)
+from .keyframes import keyframe_channel, position_keyframes
 
 __all__ = [
     "RGBAColor",
@@ -6,4 +15,8 @@ __all__ = [
     "ShadowProperties",
     "FontStyle",
     "TitleShape",
+    "Keyframe",
+    "KeyframedTitle",
+    "keyframe_channel",
+    "position_keyframes",
 ]
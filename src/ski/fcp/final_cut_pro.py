@@ -1,10 +1,13 @@
 # Build XML structure
+import heapq
+import os
 import uuid
-from datetime import datetime, time, timedelta
-from typing import Dict, List
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from ski.fcp.model import TitleShape
-from ski.utils import seconds_to_time, time_to_seconds
+from ski.utils import file_digest, seconds_to_time, stable_uid, time_to_seconds
 
 
 def time_to_frames(t: time, fps: int) -> int:
@@ -17,15 +20,51 @@ def frames_to_time_units(frames: int) -> int:
     return frames * 100
 
 
+def _timeline_lines(fps: int, total_duration: int, time_base: int, reserve: int = 0) -> List[str]:
+    """Sequence and gap lines, the only header lines depending on the duration.
+
+    `reserve` pads the tags with spaces so they can be rewritten in place.
+    """
+    pad = " " * reserve
+    return [
+        f'        <sequence format="r1" duration="{total_duration}/{time_base}s" tcStart="0/{fps}s" tcFormat="NDF" audioLayout="stereo" audioRate="48k"{pad}>',
+        "          <spine>",
+        f'            <gap name="Gap" offset="0s" start="0s" duration="{total_duration}/{time_base}s"{pad}>',
+    ]
+
+
+def project_uids(uid_seed: str | None, project_title: str) -> tuple[str | None, str | None]:
+    """Event and project UIDs derived from `uid_seed`, (None, None) without seed.
+
+    Every project built from the same seed shares the event UID.
+    """
+    if uid_seed is None:
+        return None, None
+    return stable_uid(uid_seed, "event"), stable_uid(uid_seed, "project", project_title)
+
+
 def fcp_header(
     project_title: str,
     fps: int,
     total_duration: int,
     time_base: int,
+    reserve: int = 0,
+    event_uid: str | None = None,
+    project_uid: str | None = None,
+    mod_date: datetime | None = None,
+    event_name: str | None = None,
 ) -> List[str]:
-    event_uid = uuid.uuid4()
-    project_uid = uuid.uuid4()
-    mod_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S +0000")
+    """Header lines, random UIDs and the current time when not given.
+
+    The event is named after the project unless `event_name` is given.
+    """
+    event_uid = event_uid or str(uuid.uuid4()).upper()
+    project_uid = project_uid or str(uuid.uuid4()).upper()
+    if mod_date is None:
+        mod_date = datetime.now(timezone.utc)
+    elif mod_date.tzinfo is None:
+        mod_date = mod_date.replace(tzinfo=timezone.utc)
+    mod_date_str = mod_date.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S +0000")
 
     lines = [
         '<?xml version="1.0" encoding="UTF-8"?>',
@@ -36,11 +75,9 @@ def fcp_header(
         '    <effect id="r2" name="Basic Title" uid=".../Titles.localized/Bumper:Opener.localized/Basic Title.localized/Basic Title.moti"/>',
         "  </resources>",
         "  <library>",
-        f'    <event name="{project_title}" uid="{event_uid}">',
-        f'      <project name="{project_title}" uid="{project_uid}" modDate="{mod_date}">',
-        f'        <sequence format="r1" duration="{total_duration}/{time_base}s" tcStart="0/{fps}s" tcFormat="NDF" audioLayout="stereo" audioRate="48k">',
-        "          <spine>",
-        f'            <gap name="Gap" offset="0s" start="0s" duration="{total_duration}/{time_base}s">',
+        f'    <event name="{event_name or project_title}" uid="{event_uid}">',
+        f'      <project name="{project_title}" uid="{project_uid}" modDate="{mod_date_str}">',
+        *_timeline_lines(fps, total_duration, time_base, reserve),
     ]
 
     return lines
@@ -179,25 +216,64 @@ def filter_titles(titles: List[TitleShape], duration: float) -> List[TitleShape]
     return filtered_titles
 
 
+def title_lines(title: TitleShape, fps: int, time_base: int) -> List[str]:
+    start_frames = time_to_frames(title.start_time, fps)
+    end_frames = time_to_frames(title.end_time, fps)
+    duration_frames = end_frames - start_frames
+
+    offset_units = frames_to_time_units(start_frames)
+    start_units = frames_to_time_units(start_frames)
+    duration_units = frames_to_time_units(duration_frames)
+
+    return title.xml(
+        time_base=time_base,
+        offset_units=offset_units,
+        start_units=start_units,
+        duration_units=duration_units,
+    )
+
+
+def filter_elements(elements: List[TitleShape], duration: float) -> List[TitleShape]:
+    """`filter_titles` for keyframed elements, keeping their type and keyframes."""
+    end = seconds_to_time(duration)
+    return [
+        e if time_to_seconds(e.end_time) <= duration else e.model_copy(update={"end_time": end})
+        for e in elements
+        if time_to_seconds(e.start_time) < duration
+    ]
+
+
 def generate_xml(
     titles: List[TitleShape],
     fps: int,
     project_title: str = "Title",
     duration: timedelta | None = None,
+    elements: List[TitleShape] | None = None,
+    uid_seed: str | None = None,
+    mod_date: datetime | None = None,
+    event_name: str | None = None,
 ) -> str:
+    """Build the FCPXML document.
+
+    With `uid_seed` (see `AnimationSettings.fingerprint`) and `mod_date` the
+    output is deterministic: same inputs, same bytes. Documents sharing
+    `uid_seed` and `event_name` are imported into the same event.
+    """
     final_titles = merge_titles(titles)
+    elements = elements or []
 
     # Cut titles to match the specified duration if provided
     if duration is not None:
         duration_seconds = duration.total_seconds()
         final_titles = filter_titles(final_titles, duration_seconds)
+        elements = filter_elements(elements, duration_seconds)
 
         total_frames = int(duration.total_seconds() * fps)
         total_duration = frames_to_time_units(total_frames)
 
-    elif final_titles:
-        last_caption = final_titles[-1]
-        total_frames = time_to_frames(last_caption.end_time, fps)
+    elif final_titles or elements:
+        last_end = max(t.end_time for t in [*final_titles[-1:], *elements])
+        total_frames = time_to_frames(last_end, fps)
         total_duration = frames_to_time_units(total_frames)
 
     else:
@@ -206,29 +282,233 @@ def generate_xml(
     # Time base for FCPXML (fps * 100)
     time_base = fps * 100
 
+    event_uid, project_uid = project_uids(uid_seed, project_title)
     lines = fcp_header(
         project_title=project_title,
         fps=fps,
         total_duration=total_duration,
         time_base=time_base,
+        event_uid=event_uid,
+        project_uid=project_uid,
+        mod_date=mod_date,
+        event_name=event_name,
     )
 
     for _title in final_titles:
-        start_frames = time_to_frames(_title.start_time, fps)
-        end_frames = time_to_frames(_title.end_time, fps)
-        duration_frames = end_frames - start_frames
-
-        offset_units = frames_to_time_units(start_frames)
-        start_units = frames_to_time_units(start_frames)
-        duration_units = frames_to_time_units(duration_frames)
-
-        title_xml = _title.xml(
-            time_base=time_base,
-            offset_units=offset_units,
-            start_units=start_units,
-            duration_units=duration_units,
-        )
-        lines.extend(title_xml)
+        lines.extend(title_lines(_title, fps, time_base))
+
+    for _element in elements:
+        lines.extend(title_lines(_element, fps, time_base))
 
     lines.extend(fcp_footer())
     return "\n".join(lines)
+
+
+class TitleMerger:
+    """Streaming counterpart of `merge_titles`.
+
+    Titles are fed in chunks (in order within each lane). Consecutive titles
+    with the same text are merged across chunk boundaries, and merged titles
+    are released ordered by (start_time, lane) as soon as no lane can still
+    produce an earlier one.
+    """
+
+    def __init__(self):
+        self.open: Dict[int, TitleShape] = {}
+        self.ready: List = []
+        self._counter = 0
+
+    def _close(self, title: TitleShape):
+        heapq.heappush(self.ready, (title.start_time, title.lane, self._counter, title))
+        self._counter += 1
+
+    def _release(self, final: bool = False) -> Iterator[TitleShape]:
+        horizon = min((t.start_time for t in self.open.values()), default=None)
+        while self.ready and (
+            final or horizon is None or self.ready[0][0] < horizon
+        ):
+            yield heapq.heappop(self.ready)[-1]
+
+    def feed(self, titles: Iterable[TitleShape]) -> Iterator[TitleShape]:
+        for title in titles:
+            current = self.open.get(title.lane)
+            if (
+                current is not None
+                and current.text == title.text
+                and current.end_time == title.start_time
+            ):
+                self.open[title.lane] = current.model_copy(
+                    update={"end_time": title.end_time}
+                )
+                continue
+
+            if current is not None:
+                self._close(current)
+            self.open[title.lane] = title
+
+        yield from self._release()
+
+    def flush(self) -> Iterator[TitleShape]:
+        for title in self.open.values():
+            self._close(title)
+        self.open = {}
+        yield from self._release(final=True)
+
+    def pending(self) -> List[TitleShape]:
+        """Titles not released yet (still open or waiting), in timeline order."""
+        waiting = [entry[-1] for entry in self.ready]
+        return sorted([*waiting, *self.open.values()], key=lambda t: (t.start_time, t.lane))
+
+
+class XMLStreamWriter:
+    """Write an FCPXML project title by title with bounded memory.
+
+    The header is written first with room reserved for the timeline duration,
+    which is patched in place when the writer is closed. The project goes to a
+    temporary file first; with `skip_unchanged` an existing output with the
+    same content is left untouched (`written` is False).
+    """
+
+    RESERVE = 24
+    # write to a temporary file replaced on close
+    atomic = True
+
+    def __init__(
+        self,
+        path: str | Path,
+        fps: int,
+        project_title: str = "Title",
+        duration: timedelta | None = None,
+        uid_seed: str | None = None,
+        mod_date: datetime | None = None,
+        skip_unchanged: bool = False,
+    ):
+        self.path = Path(path)
+        self.skip_unchanged = skip_unchanged
+        self.written = False
+        self.fps = fps
+        self.time_base = fps * 100
+        self.duration_seconds = duration.total_seconds() if duration is not None else None
+        self.last_end: Optional[time] = None
+        self.count = 0
+        self.done = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp") if self.atomic else self.path
+        self._file = open(self._tmp_path, "w+", encoding="utf-8")
+
+        event_uid, project_uid = project_uids(uid_seed, project_title)
+        header = fcp_header(
+            project_title=project_title,
+            fps=fps,
+            total_duration=0,
+            time_base=self.time_base,
+            reserve=self.RESERVE,
+            event_uid=event_uid,
+            project_uid=project_uid,
+            mod_date=mod_date,
+        )
+        timeline_start = len(header) - 3
+        self._file.write("\n".join(header[:timeline_start]) + "\n")
+        self._timeline_offset = self._file.tell()
+        self._file.write("\n".join(header[timeline_start:]))
+
+    def write(self, titles: Iterable[TitleShape]):
+        """Write merged titles, in timeline order."""
+        titles = list(titles)
+        if self.duration_seconds is not None:
+            kept = filter_titles(titles, self.duration_seconds)
+            # titles come in order, nothing after a dropped one can be kept
+            self.done = len(kept) < len(titles)
+            titles = kept
+
+        for _title in titles:
+            self._file.write("\n" + "\n".join(title_lines(_title, self.fps, self.time_base)))
+            self.last_end = _title.end_time
+            self.count += 1
+
+    def total_duration(self) -> int:
+        if self.duration_seconds is not None:
+            return frames_to_time_units(int(self.duration_seconds * self.fps))
+        if self.last_end is not None:
+            return frames_to_time_units(time_to_frames(self.last_end, self.fps))
+        return 0
+
+    def _patch_timeline(self, total_duration: int):
+        used = len(str(total_duration)) - 1
+        timeline = "\n".join(
+            _timeline_lines(self.fps, total_duration, self.time_base, self.RESERVE - used)
+        )
+        self._file.seek(self._timeline_offset)
+        self._file.write(timeline)
+
+    def close(self):
+        self._file.write("\n" + "\n".join(fcp_footer()))
+        self._patch_timeline(self.total_duration())
+        self._file.close()
+
+        if not self.atomic:
+            self.written = True
+            return
+        if self.skip_unchanged and self._unchanged():
+            os.unlink(self._tmp_path)
+            return
+        os.replace(self._tmp_path, self.path)
+        self.written = True
+
+    def _unchanged(self) -> bool:
+        if not self.path.exists():
+            return False
+        if self.path.stat().st_size != self._tmp_path.stat().st_size:
+            return False
+        return file_digest(self.path) == file_digest(self._tmp_path)
+
+
+class LiveXMLWriter(XMLStreamWriter):
+    """`XMLStreamWriter` for growing recordings, written in place.
+
+    After every `flush` the file is a complete project: the titles written
+    so far, the provisional ones (e.g. still open in a `TitleMerger`) and the
+    footer. The next `write` starts again where the final titles end, so
+    only the provisional titles and the footer are ever rewritten.
+    """
+
+    atomic = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._body_end = self._file.tell()
+
+    def write(self, titles: Iterable[TitleShape]):
+        self._file.seek(self._body_end)
+        super().write(titles)
+        self._body_end = self._file.tell()
+
+    def flush(self, provisional: Iterable[TitleShape] = ()):
+        self._file.seek(self._body_end)
+        last_end = self.last_end
+        for _title in provisional:
+            if self.duration_seconds is not None:
+                kept = filter_titles([_title], self.duration_seconds)
+                if not kept:
+                    continue
+                _title = kept[0]
+            self._file.write("\n" + "\n".join(title_lines(_title, self.fps, self.time_base)))
+            last_end = _title.end_time if last_end is None else max(last_end, _title.end_time)
+
+        self._file.write("\n" + "\n".join(fcp_footer()))
+        self._file.truncate()
+
+        if self.duration_seconds is not None:
+            total_duration = self.total_duration()
+        elif last_end is not None:
+            total_duration = frames_to_time_units(time_to_frames(last_end, self.fps))
+        else:
+            total_duration = 0
+        self._patch_timeline(total_duration)
+        self._file.flush()
+
+    def close(self):
+        self._file.seek(self._body_end)
+        self._file.truncate()
+        super().close()
@@ -0,0 +1,44 @@
+from typing import Callable, List
+
+import numpy as np
+
+from ski.fcp.model import Keyframe
+from ski.simplify import simplify_series
+
+
+def keyframe_channel(
+    times: np.ndarray,
+    values: np.ndarray,
+    tolerance: float = 1.0,
+    fps: int | None = None,
+    fmt: Callable[[np.ndarray], str] = lambda v: " ".join(f"{x:.1f}" for x in np.atleast_1d(v)),
+) -> List[Keyframe]:
+    """Turn a sampled channel into a keyframe list.
+
+    Samples falling on the same frame are collapsed (when `fps` is given) and
+    keyframes that linear interpolation reproduces within `tolerance` (in the
+    channel's unit) are dropped.
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float).reshape(len(times), -1)
+    if not len(times):
+        return []
+
+    if fps is not None:
+        frames = np.floor(times * fps).astype(np.int64)
+        _, first = np.unique(frames, return_index=True)
+        times, values = frames[first] / fps, values[first]
+
+    keep = simplify_series(times, values, tolerance)
+    return [Keyframe(time=float(t), value=fmt(v)) for t, v in zip(times[keep], values[keep])]
+
+
+def position_keyframes(
+    times: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    tolerance: float = 1.0,
+    fps: int | None = None,
+) -> List[Keyframe]:
+    """Keyframes for a Position param, `tolerance` in pixels."""
+    return keyframe_channel(times, np.column_stack([x, y]), tolerance=tolerance, fps=fps)
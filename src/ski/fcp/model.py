@@ -95,3 +95,39 @@ class TitleShape(BaseModel):
             "              </title>",
         ]
         return lines
+
+
+class Keyframe(BaseModel):
+    time: float  # seconds from the start of the timeline
+    value: str
+
+
+class KeyframedTitle(TitleShape):
+    """A single title whose Position is animated with keyframes.
+
+    One element replaces a title per change, so the timeline object count
+    does not depend on the track length.
+    """
+
+    position: List[Keyframe] = Field(default_factory=list)
+
+    def xml(self, time_base, offset_units, start_units, duration_units) -> List[str]:
+        lines = super().xml(time_base, offset_units, start_units, duration_units)
+        if not self.position:
+            return lines
+
+        # keyframe times are in the title's local timeline, which begins at `start`
+        fps = time_base // 100
+        start_seconds = start_units / time_base
+        keyframes = [
+            f'                    <keyframe time="{int((k.time - start_seconds) * fps) * 100 + start_units}/{time_base}s" value="{k.value}"/>'
+            for k in self.position
+        ]
+        lines[1:2] = [
+            '                <param name="Position" key="9999/999166631/999166633/1/100/101">',
+            "                  <keyframeAnimation>",
+            *keyframes,
+            "                  </keyframeAnimation>",
+            "                </param>",
+        ]
+        return lines
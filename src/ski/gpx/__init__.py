@@ -5,13 +5,57 @@ from .gpx import (
     find_segment,
     add_noise,
     interpolate_distances,
+    gap_grid,
+    mark_gaps,
     calculate_speed,
+    resample_speed,
+    haversine_distances,
+    time_window_mean,
+    gap_window_mean,
     points_to_arrays,
+    open_text,
 )
+from .slopes import (
+    load_points,
+    load_track,
+    parse_source,
+    points_from_source,
+    read_location_csv,
+    read_slopes,
+)
+from .dem import (
+    DEM,
+    correct_elevation,
+    correct_track,
+    load_dem,
+)
+from .segmentation import (
+    Activity,
+    SegmentationParams,
+    classify,
+    runs,
+    segment_track,
+)
+from .gates import (
+    Course,
+    Crossing,
+    Gate,
+    Lap,
+    SegmentGrid,
+    apply_laps,
+    course_laps,
+    elapsed_channel,
+    find_laps,
+    gate_crossings,
+    season_laps,
+)
+from .nmea import NMEAReader
 from .model import (
     Point,
     Segment,
     SpeedPoint,
+    TimeWindow,
+    TrackArrays,
 )
 
 __all__ = [
@@ -21,9 +65,45 @@ __all__ = [
     "find_segment",
     "add_noise",
     "interpolate_distances",
+    "gap_grid",
+    "mark_gaps",
     "calculate_speed",
+    "resample_speed",
+    "haversine_distances",
+    "time_window_mean",
+    "gap_window_mean",
     "points_to_arrays",
+    "open_text",
+    "load_points",
+    "load_track",
+    "parse_source",
+    "points_from_source",
+    "read_location_csv",
+    "read_slopes",
+    "DEM",
+    "correct_elevation",
+    "correct_track",
+    "load_dem",
+    "Activity",
+    "SegmentationParams",
+    "classify",
+    "runs",
+    "segment_track",
+    "Course",
+    "Crossing",
+    "Gate",
+    "Lap",
+    "SegmentGrid",
+    "apply_laps",
+    "course_laps",
+    "elapsed_channel",
+    "find_laps",
+    "gate_crossings",
+    "season_laps",
+    "NMEAReader",
     "Point",
     "Segment",
     "SpeedPoint",
+    "TimeWindow",
+    "TrackArrays",
 ]
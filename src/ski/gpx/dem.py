@@ -0,0 +1,122 @@
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from ski.gpx.model import Point, TrackArrays
+from ski.utils import LRUCache
+
+# SRTM void value
+NODATA = -32768
+
+
+def tile_name(lat: int, lon: int) -> str:
+    """SRTM tile name of the 1x1 degree cell whose south-west corner is (lat, lon)."""
+    ns = "N" if lat >= 0 else "S"
+    ew = "E" if lon >= 0 else "W"
+    return f"{ns}{abs(lat):02d}{ew}{abs(lon):03d}.hgt"
+
+
+class DEM:
+    """Digital elevation model backed by SRTM `.hgt` tiles on disk.
+
+    Tiles are memory-mapped when first needed and kept in an LRU cache, so
+    batches of points reuse loaded tiles and only the touched pages are read.
+    """
+
+    def __init__(self, directory: str | Path, max_tiles: int = 16):
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"DEM directory not found: {self.directory}")
+        self.tiles = LRUCache(max_tiles)
+
+    def tile(self, lat: int, lon: int) -> Optional[np.ndarray]:
+        key = (lat, lon)
+        if key in self.tiles:
+            return self.tiles.get(key)
+
+        path = self.directory / tile_name(lat, lon)
+        tile = None
+        if path.exists():
+            size = int(math.isqrt(path.stat().st_size // 2))
+            if size * size * 2 != path.stat().st_size:
+                raise ValueError(f"{path} is not a square SRTM tile")
+            tile = np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+
+        # missing tiles are cached too, to not stat the disk for every batch
+        self.tiles.put(key, tile)
+        return tile
+
+    def sample(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Bilinear elevation at every (lat, lon), NaN where no data is available."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        result = np.full(lat.shape, np.nan)
+
+        tile_lat = np.floor(lat).astype(np.int64)
+        tile_lon = np.floor(lon).astype(np.int64)
+        keys, inverse = np.unique(
+            np.stack([tile_lat, tile_lon], axis=1), axis=0, return_inverse=True
+        )
+
+        for k, (t_lat, t_lon) in enumerate(keys):
+            tile = self.tile(int(t_lat), int(t_lon))
+            if tile is None:
+                continue
+
+            idx = np.flatnonzero(inverse.ravel() == k)
+            n = tile.shape[0] - 1
+            # rows go from north to south
+            row = (t_lat + 1 - lat[idx]) * n
+            col = (lon[idx] - t_lon) * n
+
+            r0 = np.clip(np.floor(row).astype(np.int64), 0, n - 1)
+            c0 = np.clip(np.floor(col).astype(np.int64), 0, n - 1)
+            fr = row - r0
+            fc = col - c0
+
+            z00 = tile[r0, c0].astype(float)
+            z01 = tile[r0, c0 + 1].astype(float)
+            z10 = tile[r0 + 1, c0].astype(float)
+            z11 = tile[r0 + 1, c0 + 1].astype(float)
+
+            values = (
+                z00 * (1 - fr) * (1 - fc)
+                + z01 * (1 - fr) * fc
+                + z10 * fr * (1 - fc)
+                + z11 * fr * fc
+            )
+            void = (z00 == NODATA) | (z01 == NODATA) | (z10 == NODATA) | (z11 == NODATA)
+            values[void] = np.nan
+            result[idx] = values
+
+        return result
+
+
+@lru_cache(maxsize=4)
+def load_dem(directory: str) -> DEM:
+    """Shared DEM per directory, so its tile cache survives between calls."""
+    return DEM(directory)
+
+
+def correct_track(track: TrackArrays, dem: DEM) -> TrackArrays:
+    """Replace GPS elevation by the DEM elevation where the DEM has data."""
+    sampled = dem.sample(track.lat, track.lon)
+    ele = np.where(np.isnan(sampled), track.ele, sampled)
+    return TrackArrays(time=track.time, lat=track.lat, lon=track.lon, ele=ele)
+
+
+def correct_elevation(points: List[Point], dem: DEM) -> List[Point]:
+    """`correct_track` for a list of points."""
+    if not points:
+        return []
+
+    sampled = dem.sample(
+        np.array([p.lat for p in points]), np.array([p.lon for p in points])
+    )
+    return [
+        p if np.isnan(z) else p.model_copy(update={"ele": float(z)})
+        for p, z in zip(points, sampled)
+    ]
@@ -0,0 +1,293 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from ski.gpx.gpx import EARTH_RADIUS_M
+from ski.gpx.model import SpeedPoint, TrackArrays
+
+
+class Gate(BaseModel):
+    """A timing line between two (lat, lon) coordinates.
+
+    `direction` restricts the crossings to one side: 1 when the track goes
+    from the left to the right of a -> b, -1 for the opposite, 0 for both.
+    """
+
+    name: str
+    a: Tuple[float, float]
+    b: Tuple[float, float]
+    direction: int = 0
+
+
+class Course(BaseModel):
+    """Start and finish lines (the same gate for loops) and optional splits."""
+
+    name: str = "course"
+    start: Gate
+    finish: Gate
+    splits: List[Gate] = []
+    debounce_s: float = 2.0  # crossings of a gate closer than this are GPS jitter
+    max_lap_s: Optional[float] = None
+
+    def gates(self) -> List[Gate]:
+        unique: Dict[str, Gate] = {}
+        for gate in [self.start, *self.splits, self.finish]:
+            unique.setdefault(gate.name, gate)
+        return list(unique.values())
+
+
+class Crossing(BaseModel):
+    gate: str
+    time: float  # POSIX seconds, interpolated between the two fixes
+    index: int  # the track crosses between fixes `index` and `index + 1`
+    direction: int
+
+
+class Lap(BaseModel):
+    course: str
+    start: float  # POSIX seconds
+    finish: float
+    splits: List[float] = []  # elapsed seconds at every split gate
+
+    @property
+    def duration(self) -> float:
+        return self.finish - self.start
+
+
+def _project(lat: np.ndarray, lon: np.ndarray, lat0: float, lon0: float) -> np.ndarray:
+    """Local equirectangular projection in metres, (n, 2)."""
+    x = np.radians(np.asarray(lon, dtype=float) - lon0) * EARTH_RADIUS_M * np.cos(np.radians(lat0))
+    y = np.radians(np.asarray(lat, dtype=float) - lat0) * EARTH_RADIUS_M
+    return np.stack([x, y], axis=1)
+
+
+class SegmentGrid:
+    """Uniform grid over the segments of a polyline.
+
+    Every segment is registered in the cells its bounding box covers, the
+    (cell, segment) pairs are kept sorted by cell so a query is a few
+    `searchsorted` calls. Segments spanning more than `max_cells` cells
+    (recording gaps) are kept apart and always returned.
+    """
+
+    def __init__(self, xy: np.ndarray, cell_m: float = 50.0, max_cells: int = 64):
+        self.cell = cell_m
+        n = max(len(xy) - 1, 0)
+        if n == 0:
+            self.origin = np.zeros(2, dtype=np.int64)
+            self.width = self.height = 1
+            self.keys = np.zeros(0, dtype=np.int64)
+            self.segments = np.zeros(0, dtype=np.int64)
+            self.oversized = np.zeros(0, dtype=np.int64)
+            return
+
+        lo = np.floor(np.minimum(xy[:-1], xy[1:]) / cell_m).astype(np.int64)
+        hi = np.floor(np.maximum(xy[:-1], xy[1:]) / cell_m).astype(np.int64)
+        self.origin = lo.min(axis=0)
+        self.width = int(hi[:, 0].max() - self.origin[0] + 1)
+        self.height = int(hi[:, 1].max() - self.origin[1] + 1)
+
+        spans = hi - lo + 1
+        counts = spans[:, 0] * spans[:, 1]
+        small = counts <= max_cells
+        self.oversized = np.flatnonzero(~small)
+
+        seg = np.flatnonzero(small)
+        counts = counts[seg]
+        ids = np.repeat(seg, counts)
+        # k-th cell of every segment bounding box, row by row
+        k = np.arange(len(ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        nx = np.repeat(spans[seg, 0], counts)
+        cx = np.repeat(lo[seg, 0], counts) + k % nx
+        cy = np.repeat(lo[seg, 1], counts) + k // nx
+
+        keys = self._key(cx, cy)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.segments = ids[order]
+
+    def _key(self, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+        return (cy - self.origin[1]) * self.width + (cx - self.origin[0])
+
+    def query(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Indices of the segments that may intersect the line a-b."""
+        lo = np.floor(np.minimum(a, b) / self.cell).astype(np.int64)
+        hi = np.floor(np.maximum(a, b) / self.cell).astype(np.int64)
+        cx, cy = np.meshgrid(
+            np.arange(max(lo[0], self.origin[0]), min(hi[0], self.origin[0] + self.width - 1) + 1),
+            np.arange(max(lo[1], self.origin[1]), min(hi[1], self.origin[1] + self.height - 1) + 1),
+        )
+        keys = self._key(cx.ravel(), cy.ravel())
+
+        left = np.searchsorted(self.keys, keys, side="left")
+        right = np.searchsorted(self.keys, keys, side="right")
+        found = [self.segments[i:j] for i, j in zip(left, right) if j > i]
+        return np.unique(np.concatenate([*found, self.oversized]))
+
+
+def _intersections(
+    xy: np.ndarray, segments: np.ndarray, a: np.ndarray, b: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized segment / gate intersection.
+
+    Returns the crossing segments, the fraction along each of them and the
+    crossing direction. Fractions are in [0, 1) so a crossing exactly on a
+    fix is counted once.
+    """
+    p = xy[segments]
+    r = xy[segments + 1] - p
+    s = b - a
+    q = a - p
+
+    denom = r[:, 0] * s[1] - r[:, 1] * s[0]
+    parallel = denom == 0
+    denom = np.where(parallel, 1.0, denom)
+    t = (q[:, 0] * s[1] - q[:, 1] * s[0]) / denom
+    u = (q[:, 0] * r[:, 1] - q[:, 1] * r[:, 0]) / denom
+
+    hit = ~parallel & (t >= 0) & (t < 1) & (u >= 0) & (u <= 1)
+    # crossing the gate a->b from its left to its right gives a positive cross product
+    direction = np.where(denom > 0, 1, -1)
+    return segments[hit], t[hit], direction[hit]
+
+
+def gate_crossings(
+    track: TrackArrays,
+    gates: List[Gate],
+    cell_m: float = 50.0,
+    debounce_s: float = 2.0,
+) -> List[Crossing]:
+    """Every crossing of `gates` by the track, sorted by time.
+
+    Crossing times are interpolated between the two fixes around the line.
+    A crossing of the same gate within `debounce_s` of the previous one is
+    dropped.
+    """
+    if len(track) < 2 or not gates:
+        return []
+
+    lat0, lon0 = float(np.mean(track.lat)), float(np.mean(track.lon))
+    xy = _project(track.lat, track.lon, lat0, lon0)
+    grid = SegmentGrid(xy, cell_m=cell_m)
+
+    crossings: List[Crossing] = []
+    for gate in gates:
+        a, b = _project(
+            np.array([gate.a[0], gate.b[0]]), np.array([gate.a[1], gate.b[1]]), lat0, lon0
+        )
+        segments, fraction, direction = _intersections(xy, grid.query(a, b), a, b)
+        if gate.direction:
+            keep = direction == gate.direction
+            segments, fraction, direction = segments[keep], fraction[keep], direction[keep]
+
+        times = track.time[segments] + fraction * (track.time[segments + 1] - track.time[segments])
+        order = np.argsort(times, kind="stable")
+
+        last = -np.inf
+        for i in order:
+            if times[i] - last < debounce_s:
+                continue
+            last = times[i]
+            crossings.append(
+                Crossing(
+                    gate=gate.name,
+                    time=float(times[i]),
+                    index=int(segments[i]),
+                    direction=int(direction[i]),
+                )
+            )
+
+    crossings.sort(key=lambda c: c.time)
+    return crossings
+
+
+def find_laps(crossings: List[Crossing], course: Course) -> List[Lap]:
+    """Pair start and finish crossings into laps, recording split times.
+
+    A new start crossing restarts an open lap, splits have to be passed in
+    order. When start and finish are the same gate every crossing closes the
+    open lap and starts the next one.
+    """
+    split_names = [g.name for g in course.splits]
+    laps: List[Lap] = []
+    start: Optional[float] = None
+    splits: List[float] = []
+
+    for crossing in crossings:
+        if start is not None and course.max_lap_s is not None:
+            if crossing.time - start > course.max_lap_s:
+                start = None
+
+        if start is not None and crossing.gate == course.finish.name:
+            if len(splits) == len(split_names):
+                laps.append(
+                    Lap(course=course.name, start=start, finish=crossing.time, splits=splits)
+                )
+            start = None
+
+        if crossing.gate == course.start.name:
+            start, splits = crossing.time, []
+        elif (
+            start is not None
+            and len(splits) < len(split_names)
+            and crossing.gate == split_names[len(splits)]
+        ):
+            splits.append(crossing.time - start)
+
+    return laps
+
+
+def course_laps(track: TrackArrays, course: Course, cell_m: float = 50.0) -> List[Lap]:
+    crossings = gate_crossings(track, course.gates(), cell_m=cell_m, debounce_s=course.debounce_s)
+    return find_laps(crossings, course)
+
+
+def season_laps(tracks: Iterable[TrackArrays], course: Course) -> List[Lap]:
+    """Laps of `course` over many tracks (e.g. every run of an archive)."""
+    laps: List[Lap] = []
+    for track in tracks:
+        laps.extend(course_laps(track, course))
+    laps.sort(key=lambda lap: lap.start)
+    return laps
+
+
+def elapsed_channel(t: np.ndarray, laps: List[Lap], hold_s: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
+    """Elapsed lap time and lap number at every time of `t` (POSIX seconds).
+
+    Outside laps the elapsed time is NaN and the lap -1, except for `hold_s`
+    seconds after a finish where the final time is held.
+    """
+    t = np.asarray(t, dtype=float)
+    elapsed = np.full(t.shape, np.nan)
+    lap_ids = np.full(t.shape, -1, dtype=np.int64)
+    if not laps:
+        return elapsed, lap_ids
+
+    starts = np.array([lap.start for lap in laps])
+    finishes = np.array([lap.finish for lap in laps])
+    idx = np.searchsorted(starts, t, side="right") - 1
+    valid = idx >= 0
+    safe = np.where(valid, idx, 0)
+
+    running = valid & (t <= finishes[safe])
+    held = valid & ~running & (t <= finishes[safe] + hold_s)
+
+    elapsed[running] = t[running] - starts[safe[running]]
+    elapsed[held] = finishes[safe[held]] - starts[safe[held]]
+    lap_ids[running | held] = safe[running | held]
+    return elapsed, lap_ids
+
+
+def apply_laps(points: List[SpeedPoint], laps: List[Lap], hold_s: float = 5.0) -> List[SpeedPoint]:
+    """Fill the `elapsed_s` and `lap` channels of the points used by templates."""
+    if not points:
+        return points
+
+    t = np.array([p.time.timestamp() for p in points])
+    elapsed, lap_ids = elapsed_channel(t, laps, hold_s=hold_s)
+    for point, e, lap in zip(points, elapsed, lap_ids):
+        if lap >= 0:
+            point.elapsed_s = float(e)
+            point.lap = int(lap)
+    return points
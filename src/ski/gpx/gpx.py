@@ -1,19 +1,52 @@
+import gzip
+import io
+import zipfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence
+from typing import IO, Dict, Iterator, List, Optional, Sequence
 
 import gpxpy
 import numpy as np
 from geopy.distance import geodesic
 from gpxpy.gpx import GPX
 
-from ski.gpx.model import Point, Segment, SpeedPoint
+from ski.gpx.model import Point, Segment, SpeedPoint, TimeWindow
 from ski.utils import FileWriter
 
 
+@contextmanager
+def open_text(path: Path, member_suffix: str = ".gpx") -> Iterator[IO[str]]:
+    """Open a plain, gzip (.gz) or zip (.zip) file as a text stream.
+
+    Compressed inputs are decompressed while reading, never fully in memory.
+    For zip archives the first member ending with `member_suffix` is opened.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix == ".gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            yield f
+
+    elif suffix in {".zip", ".slopes"}:
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                n for n in archive.namelist() if n.lower().endswith(member_suffix.lower())
+            ]
+            if not members:
+                raise ValueError(f"No {member_suffix} file found in {path}")
+            with archive.open(members[0]) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8")
+
+    else:
+        with open(path, "r") as f:
+            yield f
+
+
 class GPXData:
     def __init__(self, gpx_path: Path):
-        with open(gpx_path, "r") as f:
+        with open_text(gpx_path) as f:
             _gpx = gpxpy.parse(f)
 
         self.gpx: GPX = _gpx
@@ -84,9 +117,16 @@ def collect_segments(gpx: GPX) -> Dict[int, Segment]:
 
 
 def collect_points(
-    gpx: GPX, track_id: int | None = None, segment_id: int | None = None
+    gpx: GPX,
+    track_id: int | None = None,
+    segment_id: int | None = None,
+    window: TimeWindow | None = None,
 ) -> List[Point]:
-    """Parse GPX file into a list of Points."""
+    """Parse GPX file into a list of Points.
+
+    When a `window` is given, only points inside it (plus its margin) are kept,
+    relative bounds are resolved against the first point of the selection.
+    """
     if track_id is not None:
         if track_id >= len(gpx.tracks):
             raise ValueError(
@@ -111,6 +151,15 @@ def collect_points(
             if segment_id is not None and _segment_id != segment_id:
                 continue
             for p in segment.points:
+                if window is not None and p.time is not None:
+                    if window.origin is None:
+                        window.resolve(p.time)
+                    if not window.contains(p.time):
+                        if window.is_past(p.time):
+                            # points are time ordered within a segment
+                            break
+                        continue
+
                 points.append(
                     Point(
                         time=p.time,
@@ -193,10 +242,54 @@ def add_noise(points: List[Point], noise: float = 0.001) -> List[Point]:
     return noisy_points
 
 
+def gap_grid(
+    t: np.ndarray,
+    step_seconds: float,
+    max_gap_s: float | None = None,
+    start_index: int = 0,
+    end_index: int | None = None,
+) -> np.ndarray:
+    """Times `i * step_seconds` for i in [start_index, end_index), skipping gaps.
+
+    Grid times strictly inside a recording gap (consecutive times further
+    apart than `max_gap_s`) are left out, so the grid grows with the recorded
+    time and not with the wall-clock span. `end_index` defaults to the grid
+    index of `t[-1]` (excluded).
+    """
+    if end_index is None:
+        end_index = int(np.ceil(t[-1] / step_seconds))
+    if max_gap_s is None:
+        return np.arange(start_index, end_index) * step_seconds
+
+    ranges = []
+    lo = start_index
+    for g in np.flatnonzero(np.diff(t) > max_gap_s):
+        # indices before the gap, then resume at the first fix after it
+        ranges.append(np.arange(lo, min(int(np.floor(t[g] / step_seconds)) + 1, end_index)))
+        lo = max(lo, int(np.ceil(t[g + 1] / step_seconds)))
+    ranges.append(np.arange(lo, end_index))
+    return np.concatenate(ranges) * step_seconds
+
+
+def mark_gaps(points: List[SpeedPoint], max_gap_s: float | None) -> List[SpeedPoint]:
+    """Flag the points followed by more than `max_gap_s` without a fix."""
+    if max_gap_s is None:
+        return points
+
+    for current, following in zip(points, points[1:]):
+        current.gap_after = (following.time - current.time).total_seconds() > max_gap_s
+    return points
+
+
 def interpolate_distances(
     points: List[Point],
     step_seconds: float = 0.25,
+    max_gap_s: float | None = None,
 ) -> List[Point]:
+    """Resample the points on a uniform time grid.
+
+    With `max_gap_s`, gaps between fixes longer than that are not filled in.
+    """
     if len(points) < 2:
         return [Point(**p.model_dump()) for p in points]
 
@@ -206,7 +299,7 @@ def interpolate_distances(
     t = np.array([(p.time - t0).total_seconds() for p in points])  # type: ignore
 
     # uniform time grid
-    t_new = np.arange(t[0], t[-1], step_seconds)
+    t_new = gap_grid(t, step_seconds, max_gap_s)
 
     lat = np.interp(t_new, t, [p.lat for p in points])
     lon = np.interp(t_new, t, [p.lon for p in points])
@@ -228,9 +321,81 @@ def interpolate_distances(
     return result
 
 
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_distances(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Great-circle distance (m) between consecutive points, 0 for the first one.
+
+    Vectorized alternative to the per-pair `geodesic` when ~0.5% accuracy is enough.
+    """
+    lat_r = np.radians(np.asarray(lat, dtype=float))
+    lon_r = np.radians(np.asarray(lon, dtype=float))
+    dlat = np.diff(lat_r, prepend=lat_r[:1])
+    dlon = np.diff(lon_r, prepend=lon_r[:1])
+    lat_prev = np.concatenate([lat_r[:1], lat_r[:-1]])
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_prev) * np.cos(lat_r) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def time_window_mean(t: np.ndarray, values: np.ndarray, window_s: float) -> np.ndarray:
+    """Centered moving average over a window in seconds (not in samples).
+
+    Irregular sampling is handled, every value is the mean of the samples
+    within +/- window_s / 2 of its timestamp.
+    """
+    if window_s <= 0 or len(values) == 0:
+        return np.asarray(values, dtype=float)
+
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+    lo = np.searchsorted(t, t - window_s / 2, side="left")
+    hi = np.searchsorted(t, t + window_s / 2, side="right")
+    return (cumulative[hi] - cumulative[lo]) / (hi - lo)
+
+
+def gap_window_mean(values: np.ndarray, gaps: np.ndarray, window: int) -> np.ndarray:
+    """Moving average of `window` samples that never reaches across a gap.
+
+    `values` is already padded, value k of the result is centered on
+    `values[k + window // 2]` (the alignment of `np.convolve(mode="same")`).
+    `gaps[j]` marks a gap right before `values[j]`: the windows are cut there
+    and `values[j]`, a speed over the gap, is left out of every mean. Without
+    gaps this is `np.convolve(values, kernel, mode="valid")`.
+    """
+    count = len(values) - window + 1
+    if count <= 0:
+        return np.array([], dtype=float)
+
+    gaps = np.asarray(gaps, dtype=bool)
+    index = np.arange(len(values))
+    kept = np.concatenate([[0], np.cumsum(~gaps)])
+    total = np.concatenate([[0.0], np.cumsum(np.where(gaps, 0.0, values))])
+
+    # first sample after the last gap at or before j, last gap strictly after j
+    since = np.maximum.accumulate(np.where(gaps, index, 0))
+    following = np.minimum.accumulate(np.where(gaps, index, len(values))[::-1])[::-1]
+    until = np.concatenate([following[1:], [len(values)]])
+
+    first = np.arange(count)
+    center = first + window // 2
+    lo = np.maximum(first, since[center])
+    hi = np.minimum(first + window, until[center])
+    n = kept[hi] - kept[lo]
+    return np.where(n > 0, (total[hi] - total[lo]) / np.maximum(n, 1), 0.0)
+
+
 def calculate_speed(
-    points: List[Point], smooth_window: int = 20, power_factor: float = 1.05
+    points: List[Point],
+    smooth_window: int = 20,
+    power_factor: float = 1.05,
+    max_gap_s: float | None = None,
 ) -> List[SpeedPoint]:
+    """Speed of every point, a centered moving average over `smooth_window` samples.
+
+    The average does not reach across gaps longer than `max_gap_s`, the
+    samples on each side are smoothed on their own.
+    """
     if not points:
         return []
 
@@ -259,10 +424,16 @@ def calculate_speed(
     valid = dt_s > 0
     speed[valid] = dist_3d[valid] / dt_s[valid]
 
-    # smooth (moving average)
+    # smooth (moving average), zero padded at both ends as np.convolve(mode="same")
     if smooth_window > 1:
-        kernel = np.ones(smooth_window) / smooth_window
-        speed = np.convolve(speed, kernel, mode="same")
+        ahead = (smooth_window - 1) // 2
+        behind = smooth_window - 1 - ahead
+        gaps = dt_s > max_gap_s if max_gap_s is not None else np.zeros(n, dtype=bool)
+        speed = gap_window_mean(
+            np.concatenate([np.zeros(behind), speed, np.zeros(ahead)]),
+            np.concatenate([np.zeros(behind, dtype=bool), gaps, np.zeros(ahead, dtype=bool)]),
+            smooth_window,
+        )
 
     assert len(points) == dt_s.shape[0]
 
@@ -286,6 +457,71 @@ def calculate_speed(
     return result
 
 
+def resample_speed(
+    points: List[Point],
+    step_seconds: float | None = 0.25,
+    smooth_s: float = 6.25,
+    power_factor: float = 1.05,
+    max_gap_s: float | None = None,
+) -> List[SpeedPoint]:
+    """`calculate_speed` on the raw fixes, then only the results are resampled.
+
+    Distances (haversine), speed and smoothing are computed once per recorded
+    fix, the smoothing window is in seconds so irregular sampling is handled:
+    the speed is the distance over the elapsed time within the window. The
+    position, elevation, speed and cumulative distance are then interpolated
+    on the `step_seconds` grid of `interpolate_distances` (kept on the fixes
+    when `step_seconds` is None). Gaps longer than `max_gap_s` count neither
+    in the smoothing nor in the grid.
+    """
+    if not points:
+        return []
+
+    t = _to_time_seconds([p.time for p in points])
+    lat = np.array([p.lat for p in points], dtype=float)
+    lon = np.array([p.lon for p in points], dtype=float)
+    ele = np.array([p.ele for p in points], dtype=float)
+
+    dt = np.diff(t, prepend=t[0])
+    dist_xy = haversine_distances(lat, lon)
+    dist_z = np.diff(ele, prepend=ele[0])
+    dist_3d = np.sqrt(dist_xy**2 + dist_z**2)
+
+    moving = dt <= max_gap_s if max_gap_s is not None else np.ones(len(t), dtype=bool)
+    elapsed = time_window_mean(t, np.where(moving, dt, 0.0), smooth_s)
+    moved = time_window_mean(t, np.where(moving, dist_3d, 0.0), smooth_s)
+    speed = np.where(elapsed > 0, moved / np.where(elapsed > 0, elapsed, 1.0), 0.0)
+
+    if step_seconds is not None and len(points) > 1:
+        grid = gap_grid(t, step_seconds, max_gap_s)
+        # cumulative distances are interpolated, so they still sum up to the track
+        cum_xy = np.interp(grid, t, np.cumsum(dist_xy))
+        cum_3d = np.interp(grid, t, np.cumsum(dist_3d))
+        lat, lon, ele, speed = (np.interp(grid, t, v) for v in (lat, lon, ele, speed))
+        dist_xy = np.diff(cum_xy, prepend=cum_xy[:1])
+        dist_3d = np.diff(cum_3d, prepend=cum_3d[:1])
+        dist_z = np.diff(ele, prepend=ele[:1])
+        dt = np.diff(grid, prepend=grid[:1])
+        t = grid
+
+    anchor_time = points[0].time or datetime.now()
+    return [
+        SpeedPoint(
+            time=anchor_time + timedelta(seconds=float(t[i])),
+            lat=float(lat[i]),
+            lon=float(lon[i]),
+            ele=float(ele[i]),
+            dist_xy_m=float(dist_xy[i]),
+            dist_z_m=float(dist_z[i]),
+            dist_3d_m=float(dist_3d[i]),
+            dt_s=float(dt[i]),
+            speed_mps=float(speed[i]),
+            speed_kmh=float(speed[i] * 3.6 * power_factor),
+        )
+        for i in range(len(t))
+    ]
+
+
 def points_to_arrays(
     points: Sequence[Point],
 ) -> tuple[
@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import List, Literal, Optional
-from pydantic import BaseModel
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
 
 
 class Point(BaseModel):
@@ -10,6 +12,50 @@ class Point(BaseModel):
     ele: float
 
 
+class TimeWindow(BaseModel):
+    """Time range pushed down to the readers.
+
+    `start`/`end` are absolute times or offsets from the first point of the
+    selection, `margin` (seconds) is kept on both sides for smoothing.
+    Readers call `resolve` once the first point is known.
+    """
+
+    start: Optional[datetime | timedelta] = None
+    end: Optional[datetime | timedelta] = None
+    margin: float = 0.0
+    origin: Optional[datetime] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+    def resolve(self, origin: datetime) -> "TimeWindow":
+        def _absolute(bound: datetime | timedelta | None) -> datetime | None:
+            if bound is None:
+                return None
+            if isinstance(bound, timedelta):
+                return origin + bound
+            if bound.tzinfo is None and origin.tzinfo is not None:
+                return bound.replace(tzinfo=origin.tzinfo)
+            return bound
+
+        self.origin = origin
+        self.start_time = _absolute(self.start)
+        self.end_time = _absolute(self.end)
+        return self
+
+    def contains(self, t: datetime, margin: bool = True) -> bool:
+        pad = timedelta(seconds=self.margin if margin else 0.0)
+        if self.start_time is not None and t < self.start_time - pad:
+            return False
+        if self.end_time is not None and t > self.end_time + pad:
+            return False
+        return True
+
+    def is_past(self, t: datetime) -> bool:
+        """True when `t` (and anything after it) is beyond the window."""
+        pad = timedelta(seconds=self.margin)
+        return self.end_time is not None and t > self.end_time + pad
+
+
 class Segment(BaseModel):
     type: Literal["lift", "run"]
     start: datetime
@@ -28,3 +74,68 @@ class SpeedPoint(BaseModel):
     dt_s: float = 0.0
     speed_mps: float = 0.0
     speed_kmh: float = 0.0
+    # timing channels, set when a course is timed (see `gates.apply_laps`)
+    elapsed_s: Optional[float] = None
+    lap: Optional[int] = None
+    # a hidden recording gap follows this point (see `gpx.mark_gaps`)
+    gap_after: bool = False
+
+
+class TrackArrays(BaseModel):
+    """Columnar representation of a track.
+
+    `time` holds POSIX timestamps (seconds, UTC), the other columns are aligned with it.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    time: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    ele: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @classmethod
+    def from_points(cls, points: List[Point]) -> "TrackArrays":
+        return cls(
+            time=np.array(
+                [p.time.timestamp() if p.time else np.nan for p in points], dtype=float
+            ),
+            lat=np.array([p.lat for p in points], dtype=float),
+            lon=np.array([p.lon for p in points], dtype=float),
+            ele=np.array([p.ele for p in points], dtype=float),
+        )
+
+    def to_points(self, tz=timezone.utc) -> List[Point]:
+        return [
+            Point(
+                time=datetime.fromtimestamp(float(t), tz=tz),
+                lat=float(la),
+                lon=float(lo),
+                ele=float(el),
+            )
+            for t, la, lo, el in zip(self.time, self.lat, self.lon, self.ele)
+        ]
+
+    def slice(self, start: int, stop: int) -> "TrackArrays":
+        return TrackArrays(
+            time=self.time[start:stop],
+            lat=self.lat[start:stop],
+            lon=self.lon[start:stop],
+            ele=self.ele[start:stop],
+        )
+
+    @classmethod
+    def concatenate(cls, tracks: List["TrackArrays"]) -> "TrackArrays":
+        if not tracks:
+            empty = np.array([], dtype=float)
+            return cls(time=empty, lat=empty, lon=empty, ele=empty)
+
+        return cls(
+            time=np.concatenate([t.time for t in tracks]),
+            lat=np.concatenate([t.lat for t in tracks]),
+            lon=np.concatenate([t.lon for t in tracks]),
+            ele=np.concatenate([t.ele for t in tracks]),
+        )
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from functools import reduce
+from typing import Iterable, List, Optional, Tuple
+
+# (POSIX seconds, lat, lon, ele)
+Fix = Tuple[float, float, float, float]
+
+
+def _checksum_ok(sentence: str) -> bool:
+    if "*" not in sentence:
+        return True
+    data, _, checksum = sentence[1:].partition("*")
+    try:
+        return reduce(lambda acc, c: acc ^ ord(c), data, 0) == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def _coordinate(value: str, hemisphere: str) -> float:
+    """ddmm.mmmm (dddmm.mmmm for longitudes) to signed degrees."""
+    raw = float(value)
+    degrees = int(raw // 100)
+    result = degrees + (raw - degrees * 100) / 60
+    return -result if hemisphere in ("S", "W") else result
+
+
+class NMEAReader:
+    """Incremental NMEA 0183 parser.
+
+    Lines are fed as they are read, a fix is emitted for every valid RMC
+    sentence (date, time, position) with the altitude of the latest GGA.
+    Unknown, invalid or corrupted sentences are ignored.
+    """
+
+    def __init__(self):
+        self.altitude = 0.0
+        self._partial = ""
+
+    def feed(self, text: str) -> List[Fix]:
+        """Parse complete lines of `text`, an incomplete last line is kept."""
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        return self.parse_lines(lines)
+
+    def parse_lines(self, lines: Iterable[str]) -> List[Fix]:
+        fixes = []
+        for line in lines:
+            fix = self.parse(line.strip())
+            if fix is not None:
+                fixes.append(fix)
+        return fixes
+
+    def parse(self, sentence: str) -> Optional[Fix]:
+        if not sentence.startswith("$") or not _checksum_ok(sentence):
+            return None
+
+        fields = sentence.split("*")[0].split(",")
+        kind = fields[0][3:]
+        try:
+            if kind == "GGA" and len(fields) > 9 and fields[9]:
+                self.altitude = float(fields[9])
+            elif kind == "RMC" and len(fields) > 9 and fields[2] == "A":
+                clock, date = fields[1], fields[9]
+                t = datetime.strptime(f"{date}{clock.split('.')[0]}", "%d%m%y%H%M%S")
+                fraction = float(f"0.{clock.split('.')[1]}") if "." in clock else 0.0
+                return (
+                    t.replace(tzinfo=timezone.utc).timestamp() + fraction,
+                    _coordinate(fields[3], fields[4]),
+                    _coordinate(fields[5], fields[6]),
+                    self.altitude,
+                )
+        except (ValueError, IndexError):
+            return None
+        return None
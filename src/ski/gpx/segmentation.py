@@ -0,0 +1,163 @@
+from datetime import datetime, timezone
+from typing import List, Literal
+
+import numpy as np
+from pydantic import BaseModel
+
+from ski.gpx.gpx import haversine_distances, time_window_mean
+from ski.gpx.model import TrackArrays
+
+IDLE, RUN, LIFT = 0, 1, 2
+LABELS = {IDLE: "idle", RUN: "run", LIFT: "lift"}
+
+
+class SegmentationParams(BaseModel):
+    smooth_s: float = 15.0  # speed / vertical speed smoothing window
+    idle_speed_mps: float = 1.0  # slower than this is idle
+    lift_climb_mps: float = 0.4  # climbing faster than this is a lift
+    min_duration_s: float = 30.0  # shorter stretches join their neighbours
+    max_gap_s: float = 120.0  # recording gaps longer than this are idle
+
+
+class Activity(BaseModel):
+    type: Literal["run", "lift", "idle"]
+    start_idx: int
+    stop_idx: int  # exclusive
+    start: datetime
+    end: datetime
+    duration_s: float
+    distance_m: float
+    vertical_drop_m: float  # first minus last elevation, 0 when climbing
+    max_speed_kmh: float
+
+
+def classify(track: TrackArrays, params: SegmentationParams = SegmentationParams()) -> np.ndarray:
+    """Label every sample as IDLE, RUN or LIFT in one vectorized pass."""
+    n = len(track)
+    labels = np.full(n, IDLE, dtype=np.int8)
+    if n < 2:
+        return labels
+
+    t = track.time
+    dt = np.diff(t, prepend=t[0])
+    dist = haversine_distances(track.lat, track.lon)
+    climb = np.diff(track.ele, prepend=track.ele[0])
+
+    # smoothed rates: distance (or climb) over elapsed time within the window
+    elapsed = time_window_mean(t, dt, params.smooth_s)
+    elapsed = np.where(elapsed > 0, elapsed, np.inf)
+    speed = time_window_mean(t, dist, params.smooth_s) / elapsed
+    vertical = time_window_mean(t, climb, params.smooth_s) / elapsed
+
+    moving = speed >= params.idle_speed_mps
+    labels[moving] = RUN
+    labels[moving & (vertical >= params.lift_climb_mps)] = LIFT
+    gaps = dt > params.max_gap_s
+    labels[gaps] = IDLE
+
+    return _absorb_short(labels, t, params.min_duration_s, gaps)
+
+
+def _label_runs(labels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Start and stop (exclusive) indices of stretches of equal labels."""
+    change = np.flatnonzero(np.diff(labels)) + 1
+    starts = np.concatenate([[0], change])
+    stops = np.concatenate([change, [len(labels)]])
+    return starts, stops
+
+
+def _absorb_short(
+    labels: np.ndarray,
+    t: np.ndarray,
+    min_duration_s: float,
+    gaps: np.ndarray | None = None,
+) -> np.ndarray:
+    """Relabel stretches shorter than `min_duration_s` with a neighbouring label.
+
+    Works on the list of stretches, not on the samples: the shortest stretch
+    is absorbed by its previous neighbour (the next one for the first
+    stretch) until every stretch lasts at least `min_duration_s`.
+
+    A stretch holding a recording gap (`gaps`, samples after the gap) counts
+    the gap in its duration and is never absorbed, so the stretches on
+    either side never merge across it.
+    """
+    if gaps is None:
+        gaps = np.zeros(len(labels), dtype=bool)
+    starts, stops = _label_runs(labels)
+    # [label, first time, last time, sample count, holds a gap]
+    stretches = [
+        [
+            int(labels[a]),
+            float(t[a - 1] if gaps[a] and a > 0 else t[a]),
+            float(t[b - 1]),
+            int(b - a),
+            bool(gaps[a:b].any()),
+        ]
+        for a, b in zip(starts, stops)
+    ]
+
+    while len(stretches) > 1:
+        durations = [np.inf if gap else last - first for _, first, last, _, gap in stretches]
+        k = int(np.argmin(durations))
+        if durations[k] >= min_duration_s:
+            break
+
+        j = k - 1 if k > 0 else k + 1
+        target, short = stretches[j], stretches.pop(k)
+        target[1], target[2] = min(target[1], short[1]), max(target[2], short[2])
+        target[3] += short[3]
+
+        # the absorbing stretch may now touch one with the same label
+        j = stretches.index(target)
+        for n in (j + 1, j - 1):
+            if 0 <= n < len(stretches) and stretches[n][0] == target[0]:
+                other = stretches.pop(n)
+                target[1], target[2] = min(target[1], other[1]), max(target[2], other[2])
+                target[3] += other[3]
+                target[4] = target[4] or other[4]
+                j = stretches.index(target)
+
+    return np.repeat(
+        np.array([s[0] for s in stretches], dtype=labels.dtype),
+        [s[3] for s in stretches],
+    )
+
+
+def segment_track(
+    track: TrackArrays, params: SegmentationParams = SegmentationParams()
+) -> List[Activity]:
+    """Split a whole-day track into runs, lifts and idle periods, with stats."""
+    if not len(track):
+        return []
+
+    labels = classify(track, params)
+    starts, stops = _label_runs(labels)
+
+    dist = haversine_distances(track.lat, track.lon)
+    dt = np.diff(track.time, prepend=track.time[0])
+    speed_kmh = np.where(dt > 0, dist / np.where(dt > 0, dt, 1.0), 0.0) * 3.6
+    # instantaneous speed is noisy, use a short time window for the maxima
+    speed_kmh = time_window_mean(track.time, speed_kmh, 5.0)
+
+    activities = []
+    for start, stop in zip(starts, stops):
+        ele = track.ele[start:stop]
+        activities.append(
+            Activity(
+                type=LABELS[int(labels[start])],  # type: ignore
+                start_idx=int(start),
+                stop_idx=int(stop),
+                start=datetime.fromtimestamp(float(track.time[start]), tz=timezone.utc),
+                end=datetime.fromtimestamp(float(track.time[stop - 1]), tz=timezone.utc),
+                duration_s=float(track.time[stop - 1] - track.time[start]),
+                distance_m=float(dist[start + 1 : stop].sum()),
+                vertical_drop_m=max(float(ele[0] - ele[-1]), 0.0),
+                max_speed_kmh=float(speed_kmh[start:stop].max()),
+            )
+        )
+    return activities
+
+
+def runs(activities: List[Activity]) -> List[Activity]:
+    return [a for a in activities if a.type == "run"]
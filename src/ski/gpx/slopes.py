@@ -0,0 +1,157 @@
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, List
+
+import numpy as np
+
+from ski.gpx.gpx import GPXData, collect_points, open_text
+from ski.gpx.model import Point, TimeWindow, TrackArrays
+
+# Slopes stores Core Location timestamps, seconds since 2001-01-01 (Apple epoch)
+APPLE_EPOCH_OFFSET = 978307200.0
+
+# preferred location files inside a .slopes archive
+SLOPES_MEMBERS = ("RawGPS.csv", "GPS.csv")
+
+CSV_SUFFIXES = {".csv", ".slopes"}
+
+
+def _sniff(stream: IO[str]) -> tuple[str, int, str]:
+    """Return delimiter, rows to skip (header) and the first line."""
+    first = stream.readline()
+    delimiter = "|" if "|" in first else ","
+    head = first.split(delimiter)[0].strip()
+    try:
+        float(head)
+        skip = 0
+    except ValueError:
+        skip = 1
+    return delimiter, skip, first
+
+
+def read_location_csv(stream: IO[str]) -> TrackArrays:
+    """Parse a Slopes location CSV (timestamp, lat, lon, altitude, ...).
+
+    Only the first four columns are read, course/speed/accuracy are ignored.
+    Both "|" and "," separated files are accepted.
+    """
+    delimiter, skip, first = _sniff(stream)
+    lines = [first] if not skip else []
+
+    # np.loadtxt parses the whole column block in C, no per-row python objects
+    data = np.loadtxt(
+        _chain(lines, stream),
+        delimiter=delimiter,
+        usecols=(0, 1, 2, 3),
+        ndmin=2,
+        dtype=float,
+    )
+    if not len(data):
+        raise ValueError("No track points found in CSV file")
+
+    time, lat, lon, ele = data.T
+    if np.nanmedian(time) < APPLE_EPOCH_OFFSET:
+        time = time + APPLE_EPOCH_OFFSET
+
+    order = np.argsort(time, kind="stable")
+    return TrackArrays(time=time[order], lat=lat[order], lon=lon[order], ele=ele[order])
+
+
+def _chain(lines: List[str], stream: IO[str]):
+    yield from lines
+    yield from stream
+
+
+def read_slopes(path: Path) -> TrackArrays:
+    """Read the raw location data of a `.slopes` archive."""
+    with zipfile.ZipFile(path) as archive:
+        names = {Path(n).name: n for n in archive.namelist()}
+
+    for member in SLOPES_MEMBERS:
+        if member in names:
+            with open_text(path, member_suffix=names[member]) as f:
+                return read_location_csv(f)
+
+    raise ValueError(f"No location data ({', '.join(SLOPES_MEMBERS)}) found in {path}")
+
+
+def load_track(path: Path) -> TrackArrays:
+    """Load a `.slopes` archive or a location CSV (optionally .gz/.zip) as arrays."""
+    path = Path(path)
+    if path.suffix.lower() == ".slopes":
+        return read_slopes(path)
+
+    with open_text(path, member_suffix=".csv") as f:
+        return read_location_csv(f)
+
+
+def is_location_csv(path: Path) -> bool:
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    return bool(suffixes) and (
+        suffixes[-1] in CSV_SUFFIXES
+        or (suffixes[-1] in {".gz", ".zip"} and len(suffixes) > 1 and suffixes[-2] == ".csv")
+    )
+
+
+def window_track(track: TrackArrays, window: TimeWindow) -> TrackArrays:
+    """Keep the rows of `track` inside `window` (plus its margin)."""
+    if not len(track):
+        return track
+
+    window.resolve(datetime.fromtimestamp(float(track.time[0]), tz=timezone.utc))
+    lo = (
+        window.start_time.timestamp() - window.margin
+        if window.start_time is not None
+        else -np.inf
+    )
+    hi = (
+        window.end_time.timestamp() + window.margin
+        if window.end_time is not None
+        else np.inf
+    )
+    start = np.searchsorted(track.time, lo, side="left")
+    stop = np.searchsorted(track.time, hi, side="right")
+    return track.slice(int(start), int(stop))
+
+
+def parse_source(path: Path) -> GPXData | TrackArrays:
+    """Parse a GPX (plain or compressed), CSV or `.slopes` file once."""
+    if is_location_csv(path):
+        return load_track(path)
+    return GPXData(path)
+
+
+def points_from_source(
+    source: GPXData | TrackArrays,
+    track_id: int | None = None,
+    segment_id: int | None = None,
+    window: TimeWindow | None = None,
+) -> List[Point]:
+    """Select points of an already parsed source, see `parse_source`."""
+    if isinstance(source, GPXData):
+        return collect_points(
+            gpx=source.gpx, track_id=track_id, segment_id=segment_id, window=window
+        )
+
+    if track_id is not None or segment_id is not None:
+        raise ValueError("track/segment selection is only supported for GPX files.")
+
+    track = source
+    if window is not None:
+        track = window_track(track, window)
+    if not len(track):
+        raise ValueError("No track points found in CSV file")
+    return track.to_points()
+
+
+def load_points(
+    path: Path,
+    track_id: int | None = None,
+    segment_id: int | None = None,
+    window: TimeWindow | None = None,
+) -> List[Point]:
+    """Load points from a GPX (plain or compressed), CSV or `.slopes` file."""
+    return points_from_source(
+        parse_source(path), track_id=track_id, segment_id=segment_id, window=window
+    )
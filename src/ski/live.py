@@ -0,0 +1,301 @@
+"""Live mode: overlays for a GPX or NMEA recording that is still being written.
+
+The file is tailed and every new fix goes through the same steps as
+`stream_fcpxml`, with per-fix state only (previous fix, interpolation index,
+ring buffer of the smoothing window), so each fix costs the same however
+long the recording is:
+
+    tail -> reader.feed -> LiveInterpolator -> RingSpeed -> titles -> LiveXMLWriter
+
+After every batch of fixes the outputs are complete projects, the titles
+still open are written provisionally and replaced by the next batch.
+"""
+
+import math
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from geopy.distance import geodesic
+
+from ski.config import AnimationSettings, OutputVariant
+from ski.fcp.final_cut_pro import LiveXMLWriter
+from ski.gpx.gpx import gap_grid, gap_window_mean
+from ski.gpx.model import SpeedPoint
+from ski.gpx.nmea import Fix, NMEAReader
+from ski.logger import get_logger
+from ski.pipeline import TemplateStream
+
+logger = get_logger()
+
+NMEA_SUFFIXES = {".nmea", ".nma", ".log", ".txt"}
+
+
+def tail(
+    path: Path, poll_s: float = 0.5, idle_timeout_s: Optional[float] = None
+) -> Iterator[str]:
+    """Yield the text appended to `path`, waiting for the file to appear and grow.
+
+    Stops after `idle_timeout_s` seconds without new data, never when None.
+    """
+    idle = 0.0
+    while not path.exists():
+        if idle_timeout_s is not None and idle >= idle_timeout_s:
+            raise FileNotFoundError(f"File not found: {path}")
+        time.sleep(poll_s)
+        idle += poll_s
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        idle = 0.0
+        while True:
+            text = f.read()
+            if text:
+                idle = 0.0
+                yield text
+                continue
+
+            if idle_timeout_s is not None and idle >= idle_timeout_s:
+                return
+            time.sleep(poll_s)
+            idle += poll_s
+
+
+class GPXPullReader:
+    """Incremental GPX parser, `trkpt`s are returned as soon as they are closed."""
+
+    def __init__(self, track_id: int | None = None, segment_id: int | None = None):
+        if segment_id is not None and track_id is None:
+            raise ValueError("Provide track_id.")
+        self.track_id = track_id
+        self.segment_id = segment_id
+        self.parser = ET.XMLPullParser(events=("start", "end"))
+        self.stack: List[ET.Element] = []
+        self.trk, self.seg = -1, -1
+
+    def feed(self, text: str) -> List[Fix]:
+        self.parser.feed(text)
+        fixes = []
+        for event, elem in self.parser.read_events():
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if event == "start":
+                self.stack.append(elem)
+                if tag == "trk":
+                    self.trk, self.seg = self.trk + 1, -1
+                elif tag == "trkseg":
+                    self.seg += 1
+                continue
+
+            self.stack.pop()
+            if tag != "trkpt":
+                continue
+            if self.stack:
+                self.stack[-1].remove(elem)
+
+            selected = (self.track_id is None or self.trk == self.track_id) and (
+                self.segment_id is None or self.seg == self.segment_id
+            )
+            ns = elem.tag[: elem.tag.index("}") + 1] if "}" in elem.tag else ""
+            time_text = elem.findtext(f"{ns}time")
+            if not selected or time_text is None:
+                continue
+
+            t = datetime.fromisoformat(time_text.strip())
+            if t.tzinfo is None:
+                t = t.replace(tzinfo=timezone.utc)
+            ele = elem.findtext(f"{ns}ele")
+            fixes.append(
+                (
+                    t.timestamp(),
+                    float(elem.get("lat")),  # type: ignore
+                    float(elem.get("lon")),  # type: ignore
+                    float(ele) if ele is not None else 0.0,
+                )
+            )
+        return fixes
+
+
+class LiveInterpolator:
+    """`interpolate_chunks` one fix at a time, times are relative seconds."""
+
+    def __init__(self, step_seconds: float = 0.25, max_gap_s: float | None = None):
+        self.step = step_seconds
+        self.max_gap_s = max_gap_s
+        self.previous: Optional[Fix] = None
+        self.next_index = 0
+
+    def push(self, fix: Fix) -> List[Fix]:
+        previous, self.previous = self.previous, fix
+        if previous is None or fix[0] <= previous[0]:
+            return []
+
+        end_index = int(math.ceil(fix[0] / self.step))
+        if end_index <= self.next_index:
+            return []
+
+        t = np.array([previous[0], fix[0]])
+        grid = gap_grid(t, self.step, self.max_gap_s, self.next_index, end_index)
+        self.next_index = end_index
+        columns = [np.interp(grid, t, [previous[k], fix[k]]) for k in (1, 2, 3)]
+        return list(zip(grid.tolist(), *(c.tolist() for c in columns)))
+
+
+class RingSpeed:
+    """`calculate_speed` one sample at a time.
+
+    The centered moving average of `smooth_window` samples is kept in a ring
+    buffer, a sample is released once the samples after it are known, so
+    the output lags `smooth_window // 2` samples behind the input.
+    """
+
+    def __init__(
+        self,
+        origin: datetime,
+        smooth_window: int = 25,
+        power_factor: float = 1.05,
+        max_gap_s: float | None = None,
+    ):
+        self.origin = origin
+        self.power_factor = power_factor
+        self.max_gap_s = max_gap_s
+        self.window = max(smooth_window, 1)
+        # same alignment as np.convolve(mode="same")
+        self.ahead = (self.window - 1) // 2
+        behind = self.window - 1 - self.ahead
+        self.speeds: deque = deque([0.0] * behind, maxlen=self.window)
+        self.gaps: deque = deque([False] * behind, maxlen=self.window)
+        self.rows: deque = deque()
+        self.previous: Optional[Fix] = None
+
+    def push(self, sample: Fix) -> List[SpeedPoint]:
+        t, lat, lon, ele = sample
+        dist_xy = dt = dist_z = 0.0
+        if self.previous is not None:
+            p_t, p_lat, p_lon, p_ele = self.previous
+            dist_xy = geodesic((p_lat, p_lon), (lat, lon)).meters
+            dt = t - p_t
+            dist_z = ele - p_ele
+        self.previous = sample
+
+        dist_3d = math.sqrt(dist_xy**2 + dist_z**2)
+        self.speeds.append(dist_3d / dt if dt > 0 else 0.0)
+        self.gaps.append(self.max_gap_s is not None and dt > self.max_gap_s)
+        self.rows.append((t, lat, lon, ele, dist_xy, dist_z, dist_3d, dt))
+        return self._release()
+
+    def finish(self) -> List[SpeedPoint]:
+        points = []
+        for _ in range(self.ahead):
+            # zero padding at the end, as np.convolve does
+            self.speeds.append(0.0)
+            self.gaps.append(False)
+            points.extend(self._release(final=True))
+        return points
+
+    def _release(self, final: bool = False) -> List[SpeedPoint]:
+        if not self.rows or (not final and len(self.rows) <= self.ahead):
+            return []
+
+        t, lat, lon, ele, dist_xy, dist_z, dist_3d, dt = self.rows.popleft()
+        speed = float(gap_window_mean(np.array(self.speeds), np.array(self.gaps), self.window)[0])
+        return [
+            SpeedPoint(
+                time=self.origin + timedelta(seconds=t),
+                lat=lat,
+                lon=lon,
+                ele=ele,
+                dist_xy_m=dist_xy,
+                dist_z_m=dist_z,
+                dist_3d_m=dist_3d,
+                dt_s=dt,
+                speed_mps=speed,
+                speed_kmh=speed * 3.6 * self.power_factor,
+            )
+        ]
+
+
+def live_fcpxml(settings: AnimationSettings, smooth_window: int = 25):
+    """Follow `settings.gpx_file` as it grows, keeping the outputs up to date."""
+    if settings.start is not None or settings.end is not None:
+        raise ValueError("--start/--end can not be used with --live, use --duration.")
+    if settings.runs_only or settings.run is not None or settings.course is not None:
+        raise ValueError("Run detection and course timing need the whole track, not --live.")
+    if settings.riders or settings.speed_mode != "dense" or settings.dem_dir is not None:
+        raise ValueError("--live supports a single rider, --speed-mode dense and no --dem.")
+
+    path = Path(settings.gpx_file)
+    reader = (
+        NMEAReader()
+        if path.suffix.lower() in NMEA_SUFFIXES
+        else GPXPullReader(settings.track, settings.segment)
+    )
+
+    per_template: Dict[str, List[OutputVariant]] = {}
+    for variant in settings.variants():
+        per_template.setdefault(variant.template, []).append(variant)  # type: ignore
+
+    # the file keeps changing, the UIDs follow its path and the settings
+    uid_seed = settings.fingerprint(source_digest=str(path.resolve()))
+    streams = [
+        TemplateStream(
+            t,
+            v,
+            uid_seed=uid_seed,
+            force=True,
+            hide_gaps_s=settings.max_gap_s if settings.gap_mode == "hide" else None,
+            writer=LiveXMLWriter,
+        )
+        for t, v in per_template.items()
+    ]
+
+    interpolator = (
+        LiveInterpolator(settings.interpolation_step, settings.max_gap_s)
+        if settings.interpolate
+        else None
+    )
+    origin_ts: Optional[float] = None
+    speed: Optional[RingSpeed] = None
+    n_fixes = 0
+
+    def _push(points: List[SpeedPoint]):
+        if points:
+            for stream in streams:
+                stream.push(points)
+
+    try:
+        for text in tail(path, settings.poll_s, settings.idle_timeout_s):
+            points: List[SpeedPoint] = []
+            for fix in reader.feed(text):
+                if origin_ts is None:
+                    origin_ts = fix[0]
+                    speed = RingSpeed(
+                        datetime.fromtimestamp(origin_ts, tz=timezone.utc),
+                        smooth_window,
+                        max_gap_s=settings.max_gap_s,
+                    )
+                relative = (fix[0] - origin_ts, *fix[1:])
+                samples = interpolator.push(relative) if interpolator else [relative]
+                for sample in samples:
+                    points.extend(speed.push(sample))  # type: ignore
+                n_fixes += 1
+
+            _push(points)
+            for stream in streams:
+                stream.flush()
+            if points:
+                logger.debug(f"{n_fixes} fixes, last at {points[-1].time}")
+
+            if streams and all(stream.done for stream in streams):
+                break
+    except KeyboardInterrupt:
+        logger.info("Stopped, finishing the outputs")
+
+    if speed is None:
+        raise ValueError(f"No fixes found in {path}")
+
+    _push(speed.finish())
+    for stream in streams:
+        stream.close()
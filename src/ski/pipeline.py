@@ -0,0 +1,534 @@
+"""Chunked, generator based counterpart of `create_fcpxml`.
+
+Fixed-size array chunks flow from the reader to interpolation, speed,
+templates and the writers, so peak memory is bounded by the chunk size and
+not by the length of the recording:
+
+    read_chunks -> interpolate_chunks -> speed_chunks -> titles -> XMLStreamWriter
+
+Every stage keeps the little state it needs across chunk boundaries (last
+point, smoothing window, open titles), the output matches `create_fcpxml`.
+"""
+
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from geopy.distance import geodesic
+
+from ski.config import AnimationSettings, OutputVariant
+from ski.fcp.final_cut_pro import LiveXMLWriter, TitleMerger, XMLStreamWriter
+from ski.gpx.dem import correct_track, load_dem
+from ski.gpx.gpx import gap_grid, gap_window_mean, mark_gaps, open_text
+from ski.gpx.model import SpeedPoint, TimeWindow, TrackArrays
+from ski.gpx.slopes import APPLE_EPOCH_OFFSET, SLOPES_MEMBERS, _sniff, is_location_csv
+from ski.logger import get_logger
+from ski.resources.templates import TemplateRegistry
+
+logger = get_logger()
+
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def _window_bounds(window: TimeWindow | None) -> tuple[float, float]:
+    """Window bounds (with margin) as POSIX timestamps."""
+    lo, hi = -np.inf, np.inf
+    if window is not None:
+        if window.start_time is not None:
+            lo = window.start_time.timestamp() - window.margin
+        if window.end_time is not None:
+            hi = window.end_time.timestamp() + window.margin
+    return lo, hi
+
+
+def _empty_buffer() -> Dict[str, list]:
+    return {"time": [], "lat": [], "lon": [], "ele": []}
+
+
+def _to_chunk(buffer: Dict[str, list]) -> TrackArrays:
+    return TrackArrays(**{name: np.array(values, dtype=float) for name, values in buffer.items()})
+
+
+def iter_gpx_chunks(
+    path: Path,
+    track_id: int | None = None,
+    segment_id: int | None = None,
+    window: TimeWindow | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[TrackArrays]:
+    """Stream the points of a GPX file (plain or compressed) in chunks.
+
+    The document is read with `iterparse` and every `trkpt` is dropped once
+    read, so the XML tree never holds more than a few elements.
+    """
+    if segment_id is not None and track_id is None:
+        raise ValueError("Provide track_id.")
+
+    buffer = _empty_buffer()
+    trk, seg = -1, -1
+    lo, hi = -np.inf, np.inf
+    stack: List[ET.Element] = []
+    found = False
+    past = False
+
+    with open_text(path) as f:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            tag = elem.tag.rsplit("}", 1)[-1]
+
+            if event == "start":
+                stack.append(elem)
+                if tag == "trk":
+                    trk, seg = trk + 1, -1
+                elif tag == "trkseg":
+                    seg, past = seg + 1, False
+                continue
+
+            stack.pop()
+            selected = (track_id is None or trk == track_id) and (
+                segment_id is None or seg == segment_id
+            )
+
+            if tag == "trkpt":
+                if stack:
+                    stack[-1].remove(elem)
+                if not selected or past:
+                    continue
+
+                ns = elem.tag[: elem.tag.index("}") + 1] if "}" in elem.tag else ""
+                time_text = elem.findtext(f"{ns}time")
+                if time_text is None:
+                    continue
+
+                t = datetime.fromisoformat(time_text.strip())
+                if t.tzinfo is None:
+                    t = t.replace(tzinfo=timezone.utc)
+
+                if window is not None and window.origin is None:
+                    window.resolve(t)
+                    lo, hi = _window_bounds(window)
+
+                ts = t.timestamp()
+                if ts < lo:
+                    continue
+                if ts > hi:
+                    # points are time ordered within a segment
+                    past = True
+                    if segment_id is not None:
+                        break
+                    continue
+
+                ele = elem.findtext(f"{ns}ele")
+                buffer["time"].append(ts)
+                buffer["lat"].append(float(elem.get("lat")))  # type: ignore
+                buffer["lon"].append(float(elem.get("lon")))  # type: ignore
+                buffer["ele"].append(float(ele) if ele is not None else 0.0)
+                found = True
+
+                if len(buffer["time"]) >= chunk_size:
+                    yield _to_chunk(buffer)
+                    buffer = _empty_buffer()
+
+            elif tag == "trkseg" and selected and segment_id is not None:
+                break
+            elif tag == "trk" and track_id is not None and trk == track_id:
+                break
+
+    if buffer["time"]:
+        yield _to_chunk(buffer)
+
+    if not found:
+        raise ValueError("No track points found in GPX file")
+
+
+def iter_csv_chunks(
+    path: Path,
+    window: TimeWindow | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[TrackArrays]:
+    """Stream a location CSV or `.slopes` archive in chunks (rows must be time ordered)."""
+    path = Path(path)
+    member = ".csv"
+    if path.suffix.lower() == ".slopes":
+        with zipfile.ZipFile(path) as archive:
+            names = {Path(n).name: n for n in archive.namelist()}
+        member = next((names[m] for m in SLOPES_MEMBERS if m in names), ".csv")
+
+    lo, hi = -np.inf, np.inf
+    found = False
+    with open_text(path, member_suffix=member) as f:
+        delimiter, skip, first = _sniff(f)
+        lines = [] if skip else [first]
+
+        while True:
+            lines += list(islice(f, chunk_size - len(lines)))
+            if not lines:
+                break
+
+            data = np.loadtxt(
+                lines, delimiter=delimiter, usecols=(0, 1, 2, 3), ndmin=2, dtype=float
+            )
+            lines = []
+            time, lat, lon, ele = data.T
+            if len(time) and np.nanmedian(time) < APPLE_EPOCH_OFFSET:
+                time = time + APPLE_EPOCH_OFFSET
+
+            if window is not None and window.origin is None and len(time):
+                window.resolve(datetime.fromtimestamp(float(time[0]), tz=timezone.utc))
+                lo, hi = _window_bounds(window)
+
+            keep = (time >= lo) & (time <= hi)
+            if keep.any():
+                found = True
+                yield TrackArrays(time=time[keep], lat=lat[keep], lon=lon[keep], ele=ele[keep])
+            elif len(time) and time[0] > hi:
+                break
+
+    if not found:
+        raise ValueError("No track points found in CSV file")
+
+
+def read_chunks(
+    path: Path,
+    track_id: int | None = None,
+    segment_id: int | None = None,
+    window: TimeWindow | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[TrackArrays]:
+    if is_location_csv(path):
+        if track_id is not None or segment_id is not None:
+            raise ValueError("track/segment selection is only supported for GPX files.")
+        return iter_csv_chunks(path, window=window, chunk_size=chunk_size)
+    return iter_gpx_chunks(path, track_id, segment_id, window, chunk_size)
+
+
+def relative_chunks(chunks: Iterator[TrackArrays]) -> Iterator[tuple[float, TrackArrays]]:
+    """Yield (origin, chunk) with chunk times in seconds from the first point."""
+    origin: Optional[float] = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if origin is None:
+            origin = float(chunk.time[0])
+        yield origin, TrackArrays(
+            time=chunk.time - origin, lat=chunk.lat, lon=chunk.lon, ele=chunk.ele
+        )
+
+
+def interpolate_chunks(
+    chunks: Iterator[TrackArrays],
+    step_seconds: float = 0.25,
+    max_gap_s: float | None = None,
+) -> Iterator[TrackArrays]:
+    """Streaming `interpolate_distances`, times are relative seconds.
+
+    The grid is `i * step_seconds` (without the gaps longer than `max_gap_s`),
+    the last point of every chunk is carried over so each chunk interpolates
+    up to (excluding) its last time.
+    """
+    carry: Optional[TrackArrays] = None
+    next_index = 0
+
+    for chunk in chunks:
+        if carry is not None:
+            chunk = TrackArrays.concatenate([carry, chunk])
+        carry = chunk.slice(len(chunk) - 1, len(chunk))
+
+        if len(chunk) < 2:
+            continue
+
+        end_index = int(np.ceil(chunk.time[-1] / step_seconds))
+        if end_index <= next_index:
+            continue
+
+        grid = gap_grid(chunk.time, step_seconds, max_gap_s, next_index, end_index)
+        next_index = end_index
+        if not len(grid):
+            continue
+
+        yield TrackArrays(
+            time=grid,
+            lat=np.interp(grid, chunk.time, chunk.lat),
+            lon=np.interp(grid, chunk.time, chunk.lon),
+            ele=np.interp(grid, chunk.time, chunk.ele),
+        )
+
+
+class _SpeedState:
+    COLUMNS = ("time", "lat", "lon", "ele", "dist_xy", "dist_z", "dist_3d", "dt", "speed", "gap")
+
+    def __init__(self, smooth_window: int, max_gap_s: float | None = None):
+        self.window = max(smooth_window, 1)
+        self.max_gap_s = max_gap_s
+        # np.convolve(mode="same") looks `ahead` samples forward and `behind` back
+        self.ahead = (self.window - 1) // 2
+        self.behind = self.window - 1 - self.ahead
+        self.history = np.zeros(self.behind)
+        self.history_gaps = np.zeros(self.behind, dtype=bool)
+        self.pending = {name: np.array([], dtype=float) for name in self.COLUMNS}
+        self.previous: Optional[tuple[float, float, float, float]] = None
+
+    def push(self, chunk: TrackArrays):
+        n = len(chunk)
+        dist_xy = np.zeros(n)
+        dt = np.zeros(n)
+        dist_z = np.zeros(n)
+
+        lat, lon, ele, time = chunk.lat, chunk.lon, chunk.ele, chunk.time
+        if self.previous is not None:
+            p_time, p_lat, p_lon, p_ele = self.previous
+            dist_xy[0] = geodesic((p_lat, p_lon), (lat[0], lon[0])).meters
+            dt[0] = time[0] - p_time
+            dist_z[0] = ele[0] - p_ele
+        for i in range(1, n):
+            dist_xy[i] = geodesic((lat[i - 1], lon[i - 1]), (lat[i], lon[i])).meters
+        dt[1:] = np.diff(time)
+        dist_z[1:] = np.diff(ele)
+        self.previous = (time[-1], lat[-1], lon[-1], ele[-1])
+
+        dist_3d = np.sqrt(dist_xy**2 + dist_z**2)
+        speed = np.zeros(n)
+        valid = dt > 0
+        speed[valid] = dist_3d[valid] / dt[valid]
+        gap = dt > self.max_gap_s if self.max_gap_s is not None else np.zeros(n, dtype=bool)
+
+        new = dict(
+            time=time, lat=lat, lon=lon, ele=ele, dist_xy=dist_xy,
+            dist_z=dist_z, dist_3d=dist_3d, dt=dt, speed=speed, gap=gap,
+        )
+        for name in self.COLUMNS:
+            self.pending[name] = np.concatenate([self.pending[name], new[name]])
+
+    def pop(self, final: bool = False) -> Dict[str, np.ndarray]:
+        """Rows whose smoothing window is complete (all of them when `final`)."""
+        speed = self.pending["speed"]
+        gaps = self.pending["gap"].astype(bool)
+        if final:
+            # zero padding at the end, as np.convolve does
+            speed = np.concatenate([speed, np.zeros(self.ahead)])
+            gaps = np.concatenate([gaps, np.zeros(self.ahead, dtype=bool)])
+
+        count = len(speed) - self.ahead
+        if count <= 0:
+            return {name: np.array([]) for name in (*self.COLUMNS, "smoothed")}
+
+        raw = np.concatenate([self.history, speed])
+        raw_gaps = np.concatenate([self.history_gaps, gaps])
+        smoothed = gap_window_mean(raw, raw_gaps, self.window)
+
+        ready = {name: values[:count] for name, values in self.pending.items()}
+        ready["smoothed"] = smoothed
+
+        self.history = raw[count : count + self.behind]
+        self.history_gaps = raw_gaps[count : count + self.behind]
+        self.pending = {name: values[count:] for name, values in self.pending.items()}
+        return ready
+
+
+def speed_chunks(
+    chunks: Iterator[TrackArrays],
+    origin: datetime,
+    smooth_window: int = 20,
+    power_factor: float = 1.05,
+    max_gap_s: float | None = None,
+) -> Iterator[List[SpeedPoint]]:
+    """Streaming `calculate_speed`, chunk times are seconds from `origin`."""
+    state = _SpeedState(smooth_window, max_gap_s)
+
+    def _points(rows: Dict[str, np.ndarray]) -> List[SpeedPoint]:
+        speed = rows["smoothed"] if smooth_window > 1 else rows["speed"]
+        return [
+            SpeedPoint(
+                time=origin + timedelta(seconds=float(rows["time"][i])),
+                lat=float(rows["lat"][i]),
+                lon=float(rows["lon"][i]),
+                ele=float(rows["ele"][i]),
+                dist_xy_m=float(rows["dist_xy"][i]),
+                dist_z_m=float(rows["dist_z"][i]),
+                dist_3d_m=float(rows["dist_3d"][i]),
+                dt_s=float(rows["dt"][i]),
+                speed_mps=speed[i],
+                speed_kmh=speed[i] * 3.6 * power_factor,
+            )
+            for i in range(len(rows["time"]))
+        ]
+
+    for chunk in chunks:
+        state.push(chunk)
+        points = _points(state.pop())
+        if points:
+            yield points
+
+    points = _points(state.pop(final=True))
+    if points:
+        yield points
+
+
+class TemplateStream:
+    """Applies a template chunk by chunk, overlapping one point between chunks."""
+
+    def __init__(
+        self,
+        template: str,
+        variants: List[OutputVariant],
+        uid_seed: str | None = None,
+        force: bool = False,
+        hide_gaps_s: float | None = None,
+        writer: type[XMLStreamWriter] = XMLStreamWriter,
+    ):
+        self.style = TemplateRegistry.get(template)
+        if not self.style.streamable:
+            raise ValueError(f"Template {template} can not be streamed (--chunk-size, --live).")
+        self.merger = TitleMerger()
+        self.variants = variants
+        self.uid_seed = uid_seed
+        self.force = force
+        self.hide_gaps_s = hide_gaps_s
+        self.writer = writer
+        # opened with the first points, their time is the project modDate
+        self.writers: List[XMLStreamWriter] = []
+        self.previous: Optional[SpeedPoint] = None
+        self.initial_time: Optional[datetime] = None
+        self.offset = 0
+
+    @property
+    def done(self) -> bool:
+        return bool(self.writers) and all(w.done for w in self.writers)
+
+    def _open(self, mod_date: datetime):
+        self.writers = [
+            self.writer(
+                path=v.output,
+                fps=v.fps,  # type: ignore
+                project_title=Path(v.output).stem,
+                duration=timedelta(seconds=v.duration) if v.duration else None,
+                uid_seed=self.uid_seed,
+                mod_date=mod_date,
+                skip_unchanged=not self.force,
+            )
+            for v in self.variants
+        ]
+
+    def _write(self, titles):
+        titles = list(titles)
+        for writer in self.writers:
+            if not writer.done:
+                writer.write(titles)
+
+    def push(self, points: List[SpeedPoint]):
+        if self.previous is not None:
+            points = [self.previous, *points]
+        if self.initial_time is None:
+            self.initial_time = points[0].time
+            self._open(self.initial_time)
+        mark_gaps(points, self.hide_gaps_s)
+
+        titles = self.style.apply(points, initial_time=self.initial_time, offset=self.offset)
+        self.offset += len(points) - 1
+        self.previous = points[-1]
+        self._write(self.merger.feed(titles))
+
+    def flush(self):
+        """Make the outputs complete projects with what is known so far (live writers)."""
+        provisional = self.merger.pending()
+        for writer in self.writers:
+            if isinstance(writer, LiveXMLWriter):
+                writer.flush(provisional)
+
+    def close(self):
+        self._write(self.merger.flush())
+        for writer in self.writers:
+            writer.close()
+            if writer.written:
+                logger.info(f"File saved at: {writer.path}")
+            else:
+                logger.info(f"Unchanged, skipped: {writer.path}")
+
+
+def stream_fcpxml(settings: AnimationSettings, smooth_window: int = 25):
+    """Chunked `create_fcpxml`, every output variant is written in one pass."""
+    if settings.runs_only or settings.run is not None:
+        raise ValueError("Run detection needs the whole track, it can not be used with --chunk-size.")
+    if settings.speed_mode != "dense":
+        raise ValueError("Only --speed-mode dense can be used with --chunk-size.")
+    if settings.course is not None:
+        raise ValueError("Course timing needs the whole track, it can not be used with --chunk-size.")
+
+    chunk_size = settings.chunk_size or DEFAULT_CHUNK_SIZE
+    sample_spacing = settings.interpolation_step if settings.interpolate else 2.0
+    window = settings.window(margin=(smooth_window // 2 + 1) * sample_spacing)
+
+    per_template: Dict[str, List[OutputVariant]] = {}
+    for variant in settings.variants():
+        per_template.setdefault(variant.template, []).append(variant)  # type: ignore
+
+    chunks = relative_chunks(
+        read_chunks(
+            settings.gpx_file,
+            track_id=settings.track,
+            segment_id=settings.segment,
+            window=window,
+            chunk_size=chunk_size,
+        )
+    )
+
+    # the origin is only known once the first chunk is read
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("No track points found")
+    origin_ts, first_chunk = first
+    origin = datetime.fromtimestamp(origin_ts, tz=timezone.utc)
+
+    def _tracks() -> Iterator[TrackArrays]:
+        yield first_chunk
+        for _, chunk in chunks:
+            yield chunk
+
+    tracks = _tracks()
+    if settings.dem_dir is not None:
+        dem = load_dem(str(settings.dem_dir))
+        tracks = (correct_track(chunk, dem) for chunk in tracks)
+
+    if settings.interpolate:
+        logger.debug(f"Interpolation with step: {settings.interpolation_step}")
+        tracks = interpolate_chunks(
+            tracks, step_seconds=settings.interpolation_step, max_gap_s=settings.max_gap_s
+        )
+
+    uid_seed = settings.fingerprint()
+    streams = [
+        TemplateStream(
+            t,
+            v,
+            uid_seed=uid_seed,
+            force=settings.force,
+            hide_gaps_s=settings.max_gap_s if settings.gap_mode == "hide" else None,
+        )
+        for t, v in per_template.items()
+    ]
+    n_points = 0
+    speeds = speed_chunks(
+        tracks, origin, smooth_window=smooth_window, max_gap_s=settings.max_gap_s
+    )
+    for points in speeds:
+        if window is not None:
+            # drop the smoothing margin
+            points = [p for p in points if window.contains(p.time, margin=False)]
+            if not points:
+                continue
+
+        n_points += len(points)
+        for stream in streams:
+            stream.push(points)
+
+        if all(stream.done for stream in streams):
+            break
+
+    if not n_points:
+        raise ValueError("No track points found in the selected window")
+
+    for stream in streams:
+        stream.close()
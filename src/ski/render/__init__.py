@@ -0,0 +1,9 @@
+from .minimap import project, static_layer, render_frame, render_minimap, write_png
+
+__all__ = [
+    "project",
+    "static_layer",
+    "render_frame",
+    "render_minimap",
+    "write_png",
+]
@@ -0,0 +1,232 @@
+import logging
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from ski.cli import build_minimap_settings, build_minimap_parser
+from ski.config import MinimapSettings
+from ski.gpx import load_points, points_to_arrays
+from ski.logger import get_logger, setup_logger
+from ski.simplify import simplify_polyline
+
+logger = get_logger()
+
+TRACK_COLOR = np.array([255, 255, 255, 160], dtype=np.uint8)
+TRAIL_COLOR = np.array([255, 196, 0, 255], dtype=np.uint8)
+MARKER_COLOR = np.array([255, 64, 32, 255], dtype=np.uint8)
+
+# state shared by the worker processes, set once per worker by `_init_worker`
+_worker_state: Dict = {}
+
+
+def project(lats: np.ndarray, lons: np.ndarray, width: int, height: int, padding: int) -> np.ndarray:
+    """Project lat/lon (Web Mercator) into pixel coordinates fitting the frame.
+
+    The aspect ratio of the track is preserved and the track is centered.
+    """
+    x = np.radians(lons)
+    y = np.log(np.tan(np.pi / 4 + np.radians(lats) / 2))
+
+    span_x = max(float(x.max() - x.min()), 1e-12)
+    span_y = max(float(y.max() - y.min()), 1e-12)
+    scale = min((width - 2 * padding) / span_x, (height - 2 * padding) / span_y)
+
+    px = (x - x.min()) * scale
+    py = (y.max() - y) * scale  # image y axis points down
+
+    px += (width - px.max()) / 2
+    py += (height - py.max()) / 2
+    return np.column_stack([px, py])
+
+
+def _disk(radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    r = max(int(radius), 0)
+    dy, dx = np.mgrid[-r : r + 1, -r : r + 1]
+    inside = dx**2 + dy**2 <= r**2
+    return dx[inside], dy[inside]
+
+
+def _stamp(image: np.ndarray, xy: np.ndarray, radius: int, color: np.ndarray):
+    """Paint a disk of `radius` pixels at every (x, y) position."""
+    if len(xy) == 0:
+        return
+
+    dx, dy = _disk(radius)
+    centers = np.rint(xy).astype(np.int64)
+    xs = (centers[:, 0:1] + dx[None, :]).ravel()
+    ys = (centers[:, 1:2] + dy[None, :]).ravel()
+
+    height, width = image.shape[:2]
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    image[ys[inside], xs[inside]] = color
+
+
+def _sample_polyline(xy: np.ndarray, spacing: float = 0.5) -> np.ndarray:
+    """Sample a polyline every `spacing` pixels so it can be stamped."""
+    if len(xy) < 2:
+        return xy
+
+    seg = np.diff(xy, axis=0)
+    lengths = np.hypot(seg[:, 0], seg[:, 1])
+    steps = np.maximum(np.ceil(lengths / spacing).astype(np.int64), 1)
+
+    seg_idx = np.repeat(np.arange(len(seg)), steps)
+    offsets = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    u = offsets / steps[seg_idx]
+
+    samples = xy[seg_idx] + u[:, None] * seg[seg_idx]
+    return np.vstack([samples, xy[-1:]])
+
+
+def draw_polyline(image: np.ndarray, xy: np.ndarray, line_width: int, color: np.ndarray):
+    _stamp(image, _sample_polyline(xy), line_width // 2, color)
+
+
+def static_layer(track_xy: np.ndarray, settings: MinimapSettings) -> np.ndarray:
+    """Rasterize the simplified track once, frames are composited on top of it."""
+    simplified = simplify_polyline(track_xy, settings.tolerance)
+    logger.debug(f"Track simplified from {len(track_xy)} to {len(simplified)} points")
+
+    image = np.zeros((settings.height, settings.width, 4), dtype=np.uint8)
+    draw_polyline(image, simplified, settings.line_width, TRACK_COLOR)
+    return image
+
+
+def write_png(path: str | Path, image: np.ndarray, level: int = 1):
+    """Write an RGBA uint8 image as PNG (no filtering, fast zlib level)."""
+    height, width = image.shape[:2]
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, -1)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", header))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), level)))
+        f.write(chunk(b"IEND", b""))
+
+
+def _init_worker(
+    static: np.ndarray,
+    track_xy: np.ndarray,
+    time_seconds: np.ndarray,
+    settings: MinimapSettings,
+):
+    _worker_state.update(
+        static=static, track_xy=track_xy, time_seconds=time_seconds, settings=settings
+    )
+
+
+def render_frame(
+    frame: int,
+    static: np.ndarray,
+    track_xy: np.ndarray,
+    time_seconds: np.ndarray,
+    settings: MinimapSettings,
+) -> np.ndarray:
+    """Composite the trail and the marker of a single frame over the static layer."""
+    t = frame / settings.fps
+    image = static.copy()
+
+    position = np.array(
+        [
+            [
+                np.interp(t, time_seconds, track_xy[:, 0]),
+                np.interp(t, time_seconds, track_xy[:, 1]),
+            ]
+        ]
+    )
+
+    if settings.trail > 0:
+        lo, hi = np.searchsorted(time_seconds, [t - settings.trail, t])
+        tail_start = np.array(
+            [
+                [
+                    np.interp(t - settings.trail, time_seconds, track_xy[:, 0]),
+                    np.interp(t - settings.trail, time_seconds, track_xy[:, 1]),
+                ]
+            ]
+        )
+        trail = np.vstack([tail_start, track_xy[lo:hi], position])
+        draw_polyline(image, trail, settings.line_width + 1, TRAIL_COLOR)
+
+    _stamp(image, position, settings.marker_radius, MARKER_COLOR)
+    return image
+
+
+def _render_range(start: int, stop: int) -> int:
+    state = _worker_state
+    output = Path(state["settings"].output)
+    for frame in range(start, stop):
+        image = render_frame(frame, **state)
+        write_png(output / f"frame_{frame:06d}.png", image)
+    return stop - start
+
+
+def render_minimap(settings: MinimapSettings):
+    raw_points = load_points(
+        settings.gpx_file, track_id=settings.track, segment_id=settings.segment
+    )
+    lons, lats, _, _, time_seconds, duration = points_to_arrays(raw_points)
+
+    # project once, every frame reuses the same pixel coordinates
+    track_xy = project(lats, lons, settings.width, settings.height, settings.padding)
+    static = static_layer(track_xy, settings)
+
+    if settings.duration:
+        duration = min(duration, float(settings.duration))
+    n_frames = int(duration * settings.fps) + 1
+
+    output = Path(settings.output)
+    output.mkdir(parents=True, exist_ok=True)
+    write_png(output / "track.png", static)
+
+    workers = settings.workers or os.cpu_count() or 1
+    # a few ranges per worker keep the pool balanced near the end
+    chunk = max(1, -(-n_frames // (workers * 4)))
+    ranges = [(s, min(s + chunk, n_frames)) for s in range(0, n_frames, chunk)]
+    logger.debug(f"Rendering {n_frames} frames in {len(ranges)} ranges on {workers} workers")
+
+    init_args = (static, track_xy, time_seconds, settings)
+    if workers == 1:
+        _init_worker(*init_args)
+        for start, stop in ranges:
+            _render_range(start, stop)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=init_args
+        ) as pool:
+            starts, stops = zip(*ranges)
+            list(pool.map(_render_range, starts, stops))
+
+    logger.info(f"{n_frames} frames saved at: {output}")
+
+
+def main():
+    args = build_minimap_parser().parse_args()
+    try:
+        settings = build_minimap_settings(args)
+        setup_logger(logging.DEBUG if args.verbose else logging.INFO)
+
+    except Exception as exc:
+        logger.error(f"{exc}")
+        return
+
+    render_minimap(settings=settings)
+
+
+if __name__ == "__main__":
+    main()
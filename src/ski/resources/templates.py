@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
-from datetime import datetime, time
+from datetime import datetime
 from typing import List
-from ski.fcp.model import FontStyle, RGBAColor, ShadowProperties, TitleShape
+
+import numpy as np
+
+from ski.fcp.keyframes import position_keyframes
+from ski.fcp.model import FontStyle, KeyframedTitle, RGBAColor, ShadowProperties, TitleShape
 from ski.gpx.model import SpeedPoint
-from ski.utils import seconds_to_time
+from ski.utils import format_elapsed, seconds_to_time
 
 
 simple_shadow = ShadowProperties(
@@ -20,19 +24,49 @@ default_font_style = FontStyle(
 
 
 class Style(ABC):
+    """A template turns speed points into titles.
+
+    `initial_time` and `offset` let the template be applied chunk by chunk: the
+    timeline origin and the global index of `points[0]`. Each title spans from
+    a point to the next one, so chunks must overlap by one point.
+
+    `elements` returns keyframed elements built from the whole track, templates
+    using them can not be streamed. No title should start at a point with
+    `gap_after` set.
+    """
+
+    streamable: bool = True
+
     @staticmethod
     @abstractmethod
-    def apply(points: List[SpeedPoint]) -> List[TitleShape]: ...
+    def apply(
+        points: List[SpeedPoint],
+        initial_time: datetime | None = None,
+        offset: int = 0,
+    ) -> List[TitleShape]: ...
+
+    @staticmethod
+    def elements(points: List[SpeedPoint]) -> List[TitleShape]:
+        return []
 
 
 class Default(Style):
     @staticmethod
-    def apply(points: List[SpeedPoint]) -> List[TitleShape]:
-        initial_time = points[0].time
+    def apply(
+        points: List[SpeedPoint],
+        initial_time: datetime | None = None,
+        offset: int = 0,
+    ) -> List[TitleShape]:
+        if initial_time is None:
+            initial_time = points[0].time
+
         titles = []
         for i in range(len(points) - 1):
-            start_time = titles[-1].end_time if len(titles) > 0 else time()
+            if points[i].gap_after:
+                # nothing is shown during a hidden recording gap
+                continue
 
+            start_time = seconds_to_time((points[i].time - initial_time).total_seconds())
             dt = (points[i + 1].time - initial_time).total_seconds()
             end_time = seconds_to_time(dt)
 
@@ -40,7 +74,7 @@ class Default(Style):
             text = f"""⏱ {points[i].speed_kmh:.1f} km/h"""
             titles.append(
                 TitleShape(
-                    text_style_ref=f"ts{i + 1}-speed",
+                    text_style_ref=f"ts{offset + i + 1}-speed",
                     start_time=start_time,
                     lane=1,
                     end_time=end_time,
@@ -55,7 +89,7 @@ class Default(Style):
             text = f"⛰︎ {int(points[i].ele)} m"
             titles.append(
                 TitleShape(
-                    text_style_ref=f"ts{i + 1}-elevation",
+                    text_style_ref=f"ts{offset + i + 1}-elevation",
                     start_time=start_time,
                     lane=2,
                     end_time=end_time,
@@ -68,17 +102,120 @@ class Default(Style):
         return titles
 
 
-class TemplateRegistry:
+marker_font_style = FontStyle(
+    font="Helvetica",
+    font_size=48,
+    shadow=simple_shadow,
+    alignment="center",
+)
+
+
+class Marker(Default):
+    """Default titles plus a progress marker moving along the bottom of the frame.
+
+    The marker is a single keyframed element, whatever the track length.
+    """
+
+    streamable = False
+
+    BAR_START_X = -880.0
+    BAR_END_X = 880.0
+    BAR_Y = -480.0
+    TOLERANCE_PX = 1.0
+
+    @staticmethod
+    def elements(points: List[SpeedPoint]) -> List[TitleShape]:
+        if len(points) < 2:
+            return []
+
+        initial_time = points[0].time
+        t = np.array([(p.time - initial_time).total_seconds() for p in points])
+        distance = np.cumsum([p.dist_3d_m for p in points])
+        progress = distance / distance[-1] if distance[-1] > 0 else t / t[-1]
+
+        x = Marker.BAR_START_X + progress * (Marker.BAR_END_X - Marker.BAR_START_X)
+        y = np.full_like(x, Marker.BAR_Y)
+
+        return [
+            KeyframedTitle(
+                text_style_ref="marker",
+                start_time=seconds_to_time(0.0),
+                end_time=seconds_to_time(float(t[-1])),
+                text="▲",
+                font_style=marker_font_style,
+                lane=3,
+                x=float(x[0]),
+                y=Marker.BAR_Y,
+                position=position_keyframes(t, x, y, tolerance=Marker.TOLERANCE_PX),
+            )
+        ]
+
+
+class Timing(Default):
+    """Default titles plus the elapsed lap time of a timed course.
+
+    Needs the `elapsed_s` channel (settings `course`), points outside a lap
+    get no timing title.
+    """
+
     @staticmethod
-    def apply(points: List[SpeedPoint], template: str = "default") -> List[TitleShape]:
-        templates = {
-            "default": Default,
-        }
+    def apply(
+        points: List[SpeedPoint],
+        initial_time: datetime | None = None,
+        offset: int = 0,
+    ) -> List[TitleShape]:
+        titles = Default.apply(points, initial_time=initial_time, offset=offset)
+        if initial_time is None:
+            initial_time = points[0].time
+
+        for i in range(len(points) - 1):
+            if points[i].elapsed_s is None or points[i].gap_after:
+                continue
+
+            start_time = seconds_to_time((points[i].time - initial_time).total_seconds())
+            end_time = seconds_to_time((points[i + 1].time - initial_time).total_seconds())
+            titles.append(
+                TitleShape(
+                    text_style_ref=f"ts{offset + i + 1}-lap",
+                    start_time=start_time,
+                    lane=3,
+                    end_time=end_time,
+                    text=f"⏱ {format_elapsed(points[i].elapsed_s)}",
+                    font_style=default_font_style,
+                    x=-480.0,
+                    y=400.0,
+                )
+            )
+        return titles
+
 
-        temp = templates.get(template)
+class TemplateRegistry:
+    templates = {
+        "default": Default,
+        "marker": Marker,
+        "timing": Timing,
+    }
+
+    @staticmethod
+    def get(template: str = "default") -> type[Style]:
+        temp = TemplateRegistry.templates.get(template)
         if temp is None:
             raise ValueError(
-                f"Unknown template {template}. Available templates: {templates.keys()}"
+                f"Unknown template {template}. Available templates: {TemplateRegistry.templates.keys()}"
             )
+        return temp
 
-        return temp.apply(points)
+    @staticmethod
+    def apply(
+        points: List[SpeedPoint],
+        template: str = "default",
+        initial_time: datetime | None = None,
+        offset: int = 0,
+    ) -> List[TitleShape]:
+        return TemplateRegistry.get(template).apply(
+            points, initial_time=initial_time, offset=offset
+        )
+
+    @staticmethod
+    def elements(points: List[SpeedPoint], template: str = "default") -> List[TitleShape]:
+        return TemplateRegistry.get(template).elements(points)
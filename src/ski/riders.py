@@ -0,0 +1,178 @@
+"""Multi-rider projects: several tracks on a common timeline.
+
+Every input is parsed and processed once (in parallel with --workers), the
+earliest first point is the timeline origin of all riders, and each rider
+gets its own lanes and row on screen:
+
+    prepare_points (per rider) -> common origin -> titles per rider -> one XML
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from ski.config import AnimationSettings, OutputVariant, Rider
+from ski.create_fcpxml import prepare_points, render_titles
+from ski.fcp import KeyframedTitle, TitleShape
+from ski.fcp.model import Keyframe
+from ski.gpx import SpeedPoint
+from ski.logger import get_logger
+from ski.resources.templates import TemplateRegistry
+from ski.utils import FileWriter, seconds_to_time, time_to_seconds
+
+logger = get_logger()
+
+# vertical distance between the title rows of two riders
+ROW_SPACING_PX = 90.0
+
+
+def _relative_window(settings: AnimationSettings) -> bool:
+    """True when the window depends on the first point (offsets, durations)."""
+    window = settings.window()
+    if window is None:
+        return False
+    return any(isinstance(b, timedelta) for b in (window.start, window.end))
+
+
+def _rider_settings(
+    settings: AnimationSettings, rider: Rider, keep_window: bool
+) -> AnimationSettings:
+    update = {
+        "gpx_file": rider.gpx_file,
+        "track": rider.track,
+        "segment": rider.segment,
+        "riders": [],
+    }
+    if not keep_window:
+        # offsets are resolved on the common origin once every rider is read
+        update.update(start=None, end=None, duration=None, outputs=[])
+    elif rider.clock_offset_s:
+        # the rider is read on its own clock, the offset is only added afterwards
+        window = settings.window()
+        if window is not None:
+            shift = timedelta(seconds=rider.clock_offset_s)
+            update.update(
+                start=window.start - shift if window.start is not None else None,  # type: ignore
+                end=window.end - shift if window.end is not None else None,  # type: ignore
+            )
+    return settings.model_copy(update=update)
+
+
+def prepare_riders(settings: AnimationSettings) -> tuple[datetime, List[List[SpeedPoint]]]:
+    """Points of every rider on the common time base, and its origin."""
+    riders = [
+        Rider(gpx_file=settings.gpx_file, track=settings.track, segment=settings.segment),
+        *settings.riders,
+    ]
+    relative = _relative_window(settings)
+    jobs = [_rider_settings(settings, r, keep_window=not relative) for r in riders]
+
+    workers = min(settings.workers, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_rider = list(pool.map(prepare_points, jobs))
+    else:
+        per_rider = [prepare_points(job) for job in jobs]
+
+    for rider, points in zip(riders, per_rider):
+        if rider.clock_offset_s:
+            shift = timedelta(seconds=rider.clock_offset_s)
+            for p in points:
+                p.time += shift
+
+    origin = min(points[0].time for points in per_rider)
+
+    window = settings.window() if relative else None
+    if window is not None:
+        window.resolve(origin)
+        per_rider = [
+            [p for p in points if window.contains(p.time, margin=False)]
+            for points in per_rider
+        ]
+        origin = window.start_time or origin
+
+    for rider, points in zip(riders, per_rider):
+        logger.debug(f"Rider {rider.name or rider.gpx_file}: {len(points)} points")
+
+    return origin, per_rider
+
+
+def _place(
+    title: TitleShape, rider_id: int, lane_stride: int, name: str | None, shift_s: float
+) -> TitleShape:
+    """Move a title of `rider_id` to its lanes, row and time on the common timeline."""
+    update = {
+        "lane": title.lane + rider_id * lane_stride,
+        "text_style_ref": f"r{rider_id + 1}-{title.text_style_ref}",
+        "y": title.y + rider_id * ROW_SPACING_PX,
+    }
+    if name:
+        update["text"] = f"{name} {title.text}"
+    if shift_s:
+        update["start_time"] = seconds_to_time(time_to_seconds(title.start_time) + shift_s)
+        update["end_time"] = seconds_to_time(time_to_seconds(title.end_time) + shift_s)
+    if isinstance(title, KeyframedTitle):
+        update["position"] = [
+            Keyframe(time=k.time + shift_s, value=_shift_value(k.value, rider_id))
+            for k in title.position
+        ]
+    return title.model_copy(update=update)
+
+
+def _shift_value(value: str, rider_id: int) -> str:
+    x, y = value.split()
+    return f"{x} {float(y) + rider_id * ROW_SPACING_PX}"
+
+
+def rider_titles(
+    per_rider: List[List[SpeedPoint]],
+    origin: datetime,
+    template: str,
+    names: List[str | None],
+) -> tuple[List[TitleShape], List[TitleShape]]:
+    """Titles and elements of every rider, each rider on its own lanes.
+
+    Riders without points in the window keep their (empty) lanes.
+    """
+    titles = [
+        TemplateRegistry.apply(points, template, initial_time=origin) if points else []
+        for points in per_rider
+    ]
+    # elements start at their rider's first point
+    elements = [TemplateRegistry.elements(points, template) if points else [] for points in per_rider]
+
+    lane_stride = max((t.lane for group in [*titles, *elements] for t in group), default=1)
+
+    all_titles: List[TitleShape] = []
+    all_elements: List[TitleShape] = []
+    for rider_id, (points, name) in enumerate(zip(per_rider, names)):
+        if not points:
+            continue
+        shift_s = (points[0].time - origin).total_seconds()
+        all_titles.extend(_place(t, rider_id, lane_stride, name, 0.0) for t in titles[rider_id])
+        all_elements.extend(
+            _place(e, rider_id, lane_stride, name, shift_s) for e in elements[rider_id]
+        )
+    return all_titles, all_elements
+
+
+def create_multi_rider(settings: AnimationSettings):
+    if settings.chunk_size:
+        raise ValueError("Multi-rider projects can not be used with --chunk-size.")
+
+    origin, per_rider = prepare_riders(settings)
+    names = [None, *(r.name for r in settings.riders)]
+    uid_seed = settings.fingerprint()
+
+    per_template: Dict[str, List[OutputVariant]] = {}
+    for variant in settings.variants():
+        per_template.setdefault(variant.template, []).append(variant)  # type: ignore
+
+    for template, variants in per_template.items():
+        titles, elements = rider_titles(per_rider, origin, template, names)
+        for variant in variants:
+            xml = render_titles(titles, elements, variant, uid_seed, origin)
+            if FileWriter.write(variant.output, xml, skip_unchanged=not settings.force):
+                logger.info(f"File saved at: {variant.output}")
+            else:
+                logger.info(f"Unchanged, skipped: {variant.output}")
@@ -0,0 +1,387 @@
+"""Local HTTP service wrapping `create_fcpxml`.
+
+    POST /render?fps=30&template=default   body: GPX/CSV/.slopes upload
+    POST /render                           body: JSON settings with "gpx_file"
+                                                 (path on disk) or "archive"
+    GET  /health
+
+Jobs run on a bounded process pool. Workers keep an LRU of parsed tracks and
+the front end an LRU of rendered files, so repeated requests are served
+from cache. A job writes its whole output first (the project duration in the
+header is only known at the end), the file is then sent back in chunks with
+chunked transfer encoding.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from ski.archive import SeasonArchive
+from ski.cli import build_service_parser
+from ski.config import AnimationSettings
+from ski.create_fcpxml import prepare_points, render_xml
+from ski.gpx import GPXData, TrackArrays, parse_source
+from ski.logger import get_logger, setup_logger
+from ski.utils import FileWriter, LRUCache
+
+logger = get_logger()
+
+# settings a request can not override
+RESERVED_FIELDS = {"gpx_file", "output", "outputs", "workers"}
+
+STREAM_CHUNK = 1 << 16
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# parsed sources of a worker process, set up by `_init_worker`
+_worker_sources: Optional[LRUCache] = None
+
+
+def _init_worker(cache_size: int):
+    global _worker_sources
+    _worker_sources = LRUCache(cache_size)
+
+
+def _cached_source(key: str, loader) -> GPXData | TrackArrays:
+    source = _worker_sources.get(key) if _worker_sources is not None else None
+    if source is None:
+        source = loader()
+        if _worker_sources is not None:
+            _worker_sources.put(key, source)
+    return source
+
+
+def _render_job(
+    source_key: str,
+    gpx_file: Optional[str],
+    archive: Optional[Dict[str, str]],
+    fields: Dict[str, Any],
+    output: str,
+) -> str:
+    """Runs in a worker process: parse (or reuse), compute and write `output`."""
+    if archive is not None:
+        start = datetime.fromisoformat(archive["start"])
+        end = datetime.fromisoformat(archive["end"])
+        source = _cached_source(
+            source_key, lambda: SeasonArchive(archive["path"]).query(start, end)
+        )
+        gpx_path = Path(archive["path"])
+    else:
+        source = _cached_source(source_key, lambda: parse_source(Path(gpx_file)))  # type: ignore
+        gpx_path = Path(gpx_file)  # type: ignore
+
+    settings = AnimationSettings(gpx_file=gpx_path, output=output, **fields)
+    points = prepare_points(settings, source=source)
+    uid_seed = settings.fingerprint(source_digest=source_key)
+    FileWriter.write(
+        output, render_xml(points, settings.variants()[0], uid_seed), skip_unchanged=True
+    )
+    return output
+
+
+def _digest(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class OverlayService:
+    def __init__(
+        self,
+        workers: int = 2,
+        cache_size: int = 32,
+        work_dir: Optional[Path] = None,
+        max_upload: int = 512 * 1024 * 1024,
+    ):
+        self.work_dir = Path(work_dir or tempfile.mkdtemp(prefix="ski-service-"))
+        (self.work_dir / "uploads").mkdir(parents=True, exist_ok=True)
+        (self.work_dir / "results").mkdir(parents=True, exist_ok=True)
+
+        self.max_upload = max_upload
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(cache_size,)
+        )
+        self.results = LRUCache(cache_size, on_evict=self._evict)
+        self.uploads = LRUCache(cache_size, on_evict=self._evict)
+        # identical requests arriving while a job runs wait on the same future
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        # files read by a job or being sent, evicted ones are deleted once released
+        self.in_use: Dict[str, int] = {}
+        self.evicted: Set[str] = set()
+
+    # --- cached files ---
+
+    def _evict(self, path: str):
+        if self.in_use.get(path):
+            self.evicted.add(path)
+        else:
+            Path(path).unlink(missing_ok=True)
+
+    def _acquire(self, path: str):
+        self.in_use[path] = self.in_use.get(path, 0) + 1
+        # cached again before its deletion
+        self.evicted.discard(path)
+
+    def _release(self, path: str):
+        self.in_use[path] -= 1
+        if self.in_use[path]:
+            return
+        del self.in_use[path]
+        if path in self.evicted:
+            self.evicted.discard(path)
+            Path(path).unlink(missing_ok=True)
+
+    # --- request handling ---
+
+    def _settings_fields(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        fields = {
+            k: v
+            for k, v in params.items()
+            if k in AnimationSettings.model_fields and k not in RESERVED_FIELDS
+        }
+        # validate early, errors are reported to the client as 400
+        AnimationSettings(gpx_file=Path("-"), **fields)
+        return fields
+
+    def _upload_source(self, body: bytes, params: Dict[str, str]) -> Tuple[str, str]:
+        if not body:
+            raise HTTPError(400, "Empty upload")
+
+        suffix = "".join(Path(params.get("filename", "upload.gpx")).suffixes) or ".gpx"
+        key = _digest(body) + suffix
+        path = self.work_dir / "uploads" / key
+        if key not in self.uploads:
+            if not path.exists():
+                path.write_bytes(body)
+            self.evicted.discard(str(path))
+            self.uploads.put(key, str(path))
+        return key, str(path)
+
+    async def render(self, body: bytes, content_type: str, query: Dict[str, str]) -> Tuple[Path, bool]:
+        """Return the rendered file and whether it came from cache.
+
+        The file is acquired for the caller, which releases it with `_release`.
+        """
+        archive = None
+        gpx_file = None
+        upload = None
+
+        if content_type.startswith("application/json"):
+            try:
+                params = {**query, **json.loads(body or b"{}")}
+            except json.JSONDecodeError as exc:
+                raise HTTPError(400, f"Invalid JSON: {exc}")
+
+            if params.get("archive"):
+                if not params.get("start") or not params.get("end"):
+                    raise HTTPError(400, "Archive requests need absolute start and end")
+                archive = {
+                    "path": str(params["archive"]),
+                    "start": str(params["start"]),
+                    "end": str(params["end"]),
+                }
+                index = Path(archive["path"]) / "index.json"
+                if not index.exists():
+                    raise HTTPError(404, f"Archive not found: {archive['path']}")
+                source_key = _digest(
+                    json.dumps(archive, sort_keys=True).encode(), index.read_bytes()
+                )
+                # the archive query already is the window
+                params = {k: v for k, v in params.items() if k not in {"start", "end"}}
+            elif params.get("gpx_file"):
+                path = Path(params["gpx_file"])
+                if not path.exists():
+                    raise HTTPError(404, f"File not found: {path}")
+                stat = path.stat()
+                gpx_file = str(path)
+                source_key = _digest(
+                    str(path.resolve()).encode(), f"{stat.st_size}:{stat.st_mtime_ns}".encode()
+                )
+            else:
+                raise HTTPError(400, "Provide gpx_file or archive")
+        else:
+            params = dict(query)
+            source_key, gpx_file = self._upload_source(body, query)
+            upload = gpx_file
+
+        try:
+            fields = self._settings_fields(params)
+        except ValueError as exc:
+            raise HTTPError(400, str(exc))
+
+        key = _digest(source_key.encode(), json.dumps(fields, sort_keys=True, default=str).encode())
+
+        cached = self.results.get(key)
+        if cached is not None and Path(cached).exists():
+            self._acquire(cached)
+            return Path(cached), True
+
+        if key in self.in_flight:
+            result = await asyncio.shield(self.in_flight[key])
+            if Path(result).exists():
+                self._acquire(result)
+                return Path(result), True
+            # evicted before this request resumed, rendered again below
+
+        output = str(self.work_dir / "results" / f"{key}.fcpxml")
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.pool, _render_job, source_key, gpx_file, archive, fields, output
+        )
+        self.in_flight[key] = future  # type: ignore
+        # the upload may be evicted by other requests while the job reads it
+        if upload is not None:
+            self._acquire(upload)
+        try:
+            result = await future
+        except ValueError as exc:
+            raise HTTPError(400, str(exc))
+        finally:
+            del self.in_flight[key]
+            if upload is not None:
+                self._release(upload)
+
+        self._acquire(result)
+        self.results.put(key, result)
+        return Path(result), False
+
+    # --- HTTP plumbing ---
+
+    async def _send_error(self, writer: asyncio.StreamWriter, status: int, message: str):
+        payload = json.dumps({"error": message}).encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + payload
+        )
+        await writer.drain()
+
+    async def _stream_file(self, writer: asyncio.StreamWriter, path: Path, cached: bool):
+        writer.write(
+            (
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: application/xml\r\n"
+                f'Content-Disposition: attachment; filename="{path.name}"\r\n'
+                f"X-Cache: {'hit' if cached else 'miss'}\r\n"
+                "Transfer-Encoding: chunked\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+        )
+        with open(path, "rb") as f:
+            while chunk := f.read(STREAM_CHUNK):
+                writer.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(" ", 2)
+
+            headers: Dict[str, str] = {}
+            while (line := (await reader.readline()).decode("latin-1").strip()):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > self.max_upload:
+                raise HTTPError(413, f"Upload larger than {self.max_upload} bytes")
+            body = await reader.readexactly(length) if length else b""
+
+            url = urlsplit(target)
+            query = dict(parse_qsl(url.query))
+
+            if url.path == "/health" and method == "GET":
+                payload = json.dumps(
+                    {"results": len(self.results), "in_flight": len(self.in_flight)}
+                ).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+                return
+
+            if url.path != "/render":
+                raise HTTPError(404, f"Unknown path {url.path}")
+            if method != "POST":
+                raise HTTPError(405, "Use POST /render")
+
+            path, cached = await self.render(
+                body, headers.get("content-type", ""), query
+            )
+            logger.info(f"{method} {target} -> {path.name} ({'hit' if cached else 'miss'})")
+            try:
+                await self._stream_file(writer, path, cached)
+            finally:
+                self._release(str(path))
+
+        except HTTPError as exc:
+            logger.debug(f"{exc.status}: {exc}")
+            await self._send_error(writer, exc.status, str(exc))
+        except (ValueError, asyncio.IncompleteReadError) as exc:
+            await self._send_error(writer, 400, str(exc))
+        except Exception as exc:
+            logger.error(f"{exc}")
+            await self._send_error(writer, 500, str(exc))
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info(f"Serving on http://{host}:{port} (work dir: {self.work_dir})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def main():
+    args = build_service_parser().parse_args()
+    setup_logger(logging.DEBUG if args.verbose else logging.INFO)
+
+    service = OverlayService(
+        workers=args.workers or os.cpu_count() or 1,
+        cache_size=args.cache_size,
+        work_dir=Path(args.work_dir) if args.work_dir else None,
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Sharded outputs: a long recording as several small projects of one event.
+
+The points are processed once, then cut into shards of a fixed duration, of
+a bounded title count or one per detected run. Every shard is rendered on
+its own timeline starting at 0 (in parallel with --workers) and written as
+`<stem>_partNN<suffix>` next to each output, all of them in one event:
+
+    prepare_points -> shard bounds -> titles per shard -> one XML per shard and variant
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from ski.config import AnimationSettings, OutputVariant
+from ski.create_fcpxml import create_titles, prepare_points, write_variants
+from ski.fcp.final_cut_pro import merge_titles
+from ski.gpx import SpeedPoint, TrackArrays, runs, segment_track
+from ski.logger import get_logger
+from ski.utils import time_to_seconds
+
+logger = get_logger()
+
+# shard size when --shard-size is not given, well below the ~20k shapes FCP struggles with
+DEFAULT_SHARD_SIZE = {"duration": 900.0, "titles": 5000.0}
+
+Bounds = List[tuple[int, int]]
+
+
+def shard_output(output: str, index: int) -> str:
+    path = Path(output)
+    return str(path.with_name(f"{path.stem}_part{index + 1:02d}{path.suffix}"))
+
+
+def _relative_times(points: List[SpeedPoint]) -> np.ndarray:
+    origin = points[0].time
+    return np.array([(p.time - origin).total_seconds() for p in points])
+
+
+def _cut(t: np.ndarray, cuts: np.ndarray) -> Bounds:
+    """Consecutive shards starting at the first point at or after every cut time.
+
+    Each shard ends on the first point of the next one so the timelines meet.
+    """
+    starts = np.unique(np.searchsorted(t, cuts, side="left"))
+    starts = starts[(starts > 0) & (starts < len(t) - 1)]
+    edges = [0, *starts.tolist(), len(t) - 1]
+    return [(a, b + 1) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def duration_bounds(points: List[SpeedPoint], seconds: float) -> Bounds:
+    t = _relative_times(points)
+    return _cut(t, np.arange(seconds, t[-1], seconds))
+
+
+def title_bounds(points: List[SpeedPoint], template: str, max_titles: int) -> Bounds:
+    """Shards of at most about `max_titles` merged titles of `template`.
+
+    Titles crossing a cut are split in two, a shard can exceed the budget
+    by the number of lanes.
+    """
+    titles = merge_titles(create_titles(points=list(points), template=template))
+    starts = np.array([time_to_seconds(title.start_time) for title in titles])
+    return _cut(_relative_times(points), starts[max_titles::max_titles])
+
+
+def run_bounds(points: List[SpeedPoint]) -> Bounds:
+    """One shard per detected run, lifts and idle periods are left out."""
+    activities = runs(segment_track(TrackArrays.from_points(points)))  # type: ignore
+    if not activities:
+        raise ValueError("No runs detected")
+    return [(a.start_idx, a.stop_idx) for a in activities]
+
+
+def shard_bounds(points: List[SpeedPoint], settings: AnimationSettings) -> Bounds:
+    """Start and stop (exclusive) point indices of every shard."""
+    if len(points) < 2:
+        return [(0, len(points))]
+
+    if settings.shard_by == "run":
+        bounds = run_bounds(points)
+    else:
+        size = settings.shard_size or DEFAULT_SHARD_SIZE[settings.shard_by]  # type: ignore
+        if size <= 0:
+            raise ValueError(f"--shard-size must be positive, got {size}")
+        if settings.shard_by == "duration":
+            bounds = duration_bounds(points, size)
+        else:
+            template = settings.variants()[0].template
+            bounds = title_bounds(points, template, int(size))  # type: ignore
+    return [(a, b) for a, b in bounds if b - a >= 2]
+
+
+def _shard_variants(
+    variants: List[OutputVariant], index: int, offset_s: float
+) -> List[OutputVariant]:
+    """Variants of one shard, their duration is what is left of it after `offset_s`."""
+    shard = []
+    for variant in variants:
+        update: Dict = {"output": shard_output(variant.output, index)}
+        if variant.duration is not None:
+            if offset_s >= variant.duration:
+                continue
+            update["duration"] = variant.duration - offset_s
+        shard.append(variant.model_copy(update=update))
+    return shard
+
+
+def _write_shard(
+    points: List[SpeedPoint],
+    index: int,
+    offset_s: float,
+    per_template: Dict[str, List[OutputVariant]],
+    uid_seed: str,
+    force: bool,
+    event_name: str,
+) -> List[str]:
+    written = []
+    for template, variants in per_template.items():
+        variants = _shard_variants(variants, index, offset_s)
+        if not variants:
+            continue
+        written.extend(write_variants(points, template, variants, uid_seed, force, event_name))
+    return written
+
+
+def create_sharded(settings: AnimationSettings):
+    if settings.chunk_size or settings.live:
+        raise ValueError("Sharded outputs can not be used with --chunk-size or --live.")
+    if settings.riders:
+        raise ValueError("Sharded outputs can not be used with multi-rider projects.")
+
+    points = prepare_points(settings)
+    bounds = shard_bounds(points, settings)
+    if not bounds:
+        raise ValueError("No shard with at least two points")
+
+    origin = points[0].time
+    shards = [points[a:b] for a, b in bounds]
+    offsets = [(shard[0].time - origin).total_seconds() for shard in shards]
+    logger.debug(f"{len(shards)} shards by {settings.shard_by}")
+
+    per_template: Dict[str, List[OutputVariant]] = {}
+    for variant in settings.variants():
+        per_template.setdefault(variant.template, []).append(variant)  # type: ignore
+
+    # every shard of every output shares the event, named after the first output
+    uid_seed = settings.fingerprint()
+    event_name = Path(settings.variants()[0].output).stem
+    args = (
+        range(len(shards)),
+        offsets,
+        repeat(per_template),
+        repeat(uid_seed),
+        repeat(settings.force),
+        repeat(event_name),
+    )
+
+    workers = min(settings.workers, len(shards))
+    if workers <= 1:
+        list(map(_write_shard, shards, *args))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_write_shard, shards, *args))
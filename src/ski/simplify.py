@@ -0,0 +1,95 @@
+import numpy as np
+
+
+def _point_segment_distances(points: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Perpendicular distance of every point to the segment a-b."""
+    ab = b - a
+    length_sq = float(np.dot(ab, ab))
+    if length_sq == 0.0:
+        return np.linalg.norm(points - a, axis=1)
+
+    u = np.clip(((points - a) @ ab) / length_sq, 0.0, 1.0)
+    projection = a + u[:, None] * ab
+    return np.linalg.norm(points - projection, axis=1)
+
+
+def rdp_mask(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Ramer-Douglas-Peucker simplification of a polyline.
+
+    `points` is an (n, d) array. Returns a boolean mask with the points to keep,
+    the first and last points are always kept.
+    """
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    # iterative to avoid recursion limits on long tracks
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        distances = _point_segment_distances(
+            points[start + 1 : end], points[start], points[end]
+        )
+        idx = int(np.argmax(distances))
+        if distances[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return keep
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Return the simplified (m, d) polyline, see `rdp_mask`."""
+    return points[rdp_mask(points, tolerance)]
+
+
+def simplify_series(t: np.ndarray, values: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker for time series, measured as interpolation error.
+
+    `values` is (n,) or (n, d). A sample is dropped when linear interpolation
+    between the kept neighbours reproduces it within `tolerance` on every
+    dimension. Returns a boolean mask of the samples to keep.
+    """
+    t = np.asarray(t, dtype=float)
+    values = np.asarray(values, dtype=float).reshape(len(t), -1)
+    n = len(t)
+
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        span = t[end] - t[start]
+        u = (t[start + 1 : end] - t[start]) / span if span > 0 else np.zeros(end - start - 1)
+        expected = values[start] + u[:, None] * (values[end] - values[start])
+        errors = np.abs(values[start + 1 : end] - expected).max(axis=1)
+
+        idx = int(np.argmax(errors))
+        if errors[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return keep
@@ -1,5 +1,9 @@
-from datetime import time
+import hashlib
+import uuid
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
 from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
 
 
 def seconds_to_time(seconds: float) -> time:
@@ -18,13 +22,111 @@ def time_to_seconds(t: time) -> float:
     return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1_000_000
 
 
+def format_elapsed(seconds: float) -> str:
+    """Lap time as m:ss.s"""
+    # rounded first, 59.96 s is 1:00.0 and not 0:60.0
+    minutes, rest = divmod(round(seconds, 1), 60)
+    return f"{int(minutes)}:{rest:04.1f}"
+
+
+def parse_time_bound(value: str | float | datetime | timedelta) -> datetime | timedelta:
+    """Parse an absolute time (ISO 8601) or an offset (seconds, MM:SS or HH:MM:SS)."""
+    if isinstance(value, (datetime, timedelta)):
+        return value
+
+    if isinstance(value, (int, float)):
+        return timedelta(seconds=value)
+
+    text = value.strip()
+    try:
+        return timedelta(seconds=float(text))
+    except ValueError:
+        pass
+
+    parts = text.split(":")
+    if len(parts) in (2, 3) and "-" not in text:
+        try:
+            seconds = 0.0
+            for part in parts:
+                seconds = seconds * 60 + float(part)
+            return timedelta(seconds=seconds)
+        except ValueError:
+            pass
+
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(
+            f"Invalid time {value!r}: use ISO 8601, seconds, MM:SS or HH:MM:SS."
+        )
+
+
+# namespace of the UIDs derived from inputs and settings
+UID_NAMESPACE = uuid.UUID("6f1d2c1e-5a3b-4c8e-9d7f-2b4a6c8e0f13")
+
+
+def stable_uid(*parts: str) -> str:
+    """Deterministic UID for the given parts, in the upper case form FCP uses."""
+    return str(uuid.uuid5(UID_NAMESPACE, "\x1f".join(parts))).upper()
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def same_content(path: Path, content: bytes) -> bool:
+    """True when `path` exists and holds exactly `content` (size check first)."""
+    if not path.exists() or path.stat().st_size != len(content):
+        return False
+    return file_digest(path) == hashlib.sha256(content).hexdigest()
+
+
 class FileWriter:
     @staticmethod
-    def write(path: str | Path, content: str):
+    def write(path: str | Path, content: str, skip_unchanged: bool = False) -> bool:
+        """Write `content`, return False when skipped because the file is unchanged."""
         if isinstance(path, str):
             path = Path(path)
 
         path.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(path, "w") as f:
+        if skip_unchanged and same_content(path, content.encode("utf-8")):
+            return False
+
+        with open(path, "w", encoding="utf-8") as f:
             f.write(content)
+        return True
+
+
+class LRUCache:
+    """Small least-recently-used mapping, `on_evict` is called with evicted values."""
+
+    def __init__(self, maxsize: int, on_evict: Optional[Callable[[Any], None]] = None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._data: OrderedDict = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            _, evicted = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
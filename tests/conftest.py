@@ -0,0 +1,10 @@
+from pathlib import Path
+
+import pytest
+
+from tracks import paused_track, write_gpx
+
+
+@pytest.fixture
+def paused_gpx(tmp_path: Path) -> Path:
+    return write_gpx(tmp_path / "paused.gpx", paused_track())
@@ -0,0 +1,21 @@
+from datetime import timedelta
+from pathlib import Path
+
+from ski.archive.store import SeasonArchive
+from tracks import START, descent, write_gpx
+
+
+def test_changed_file_replaces_its_points(tmp_path: Path):
+    archive = SeasonArchive(tmp_path / "archive")
+    gpx = tmp_path / "day.gpx"
+
+    write_gpx(gpx, descent(START, 100, 10.0))
+    assert archive.ingest(gpx) == 100
+    assert archive.ingest(gpx) == 0
+
+    write_gpx(gpx, descent(START, 150, 10.0))
+    assert archive.ingest(gpx) == 150
+
+    track = archive.query(START - timedelta(hours=1), START + timedelta(hours=1))
+    assert len(track) == 150
+    assert len(SeasonArchive(tmp_path / "archive").query(START, START + timedelta(hours=1))) == 150
@@ -0,0 +1,35 @@
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from ski.config import AnimationSettings
+from ski.create_fcpxml import create_fcpxml
+
+
+def _titles(path: Path):
+    """Lane, timing and text of every title, UIDs and padding left out."""
+    root = ET.parse(path).getroot()
+    return [
+        (
+            title.get("lane"),
+            title.get("offset"),
+            title.get("duration"),
+            "".join(title.find("text").itertext()),
+        )
+        for title in root.iter("title")
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 37])
+def test_chunked_output_matches_in_memory(paused_gpx: Path, tmp_path: Path, chunk_size: int):
+    in_memory = tmp_path / "in_memory.fcpxml"
+    chunked = tmp_path / f"chunked_{chunk_size}.fcpxml"
+    create_fcpxml(AnimationSettings(gpx_file=paused_gpx, output=str(in_memory)))
+    create_fcpxml(
+        AnimationSettings(gpx_file=paused_gpx, output=str(chunked), chunk_size=chunk_size)
+    )
+
+    expected = _titles(in_memory)
+    assert expected
+    assert _titles(chunked) == expected
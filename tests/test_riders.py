@@ -0,0 +1,27 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from ski.config import AnimationSettings, Rider
+from ski.riders import prepare_riders
+from tracks import START, descent, write_gpx
+
+
+@pytest.mark.parametrize("clock_offset_s", [0.0, 60.0, -30.0])
+def test_absolute_window_applies_to_corrected_clocks(tmp_path: Path, clock_offset_s: float):
+    gpx = write_gpx(tmp_path / "rider.gpx", descent(START, 180, 10.0))
+    start, end = START + timedelta(seconds=90), START + timedelta(seconds=120)
+    settings = AnimationSettings(
+        gpx_file=gpx,
+        interpolate=False,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        riders=[Rider(gpx_file=gpx, clock_offset_s=clock_offset_s)],
+    )
+
+    _, per_rider = prepare_riders(settings)
+
+    for points in per_rider:
+        assert points
+        assert start <= points[0].time and points[-1].time <= end
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from ski.gpx import TrackArrays, runs, segment_track
+from tracks import START, descent
+
+
+def _track(points) -> TrackArrays:
+    return TrackArrays.from_points(points)
+
+
+def test_runs_are_kept_apart_across_a_gap():
+    first = descent(START, 120, 10.0)
+    second = descent(first[-1].time + timedelta(hours=2), 120, 10.0, lat=first[-1].lat)
+
+    found = runs(segment_track(_track([*first, *second])))
+
+    assert len(found) == 2
+    assert found[0].stop_idx <= len(first) <= found[1].start_idx
+
+
+def test_vertical_drop_is_zero_when_climbing():
+    run = descent(START, 120, 10.0)
+    climb = [p.model_copy(update={"ele": 1000.0 + 3.0 * i}) for i, p in enumerate(run)]
+
+    (down,) = segment_track(_track(run))
+    (up,) = segment_track(_track(climb))
+
+    assert down.vertical_drop_m == 3.0 * (len(run) - 1)
+    assert up.vertical_drop_m == 0.0
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+from ski.service import OverlayService
+
+
+@pytest.fixture
+def service(tmp_path: Path):
+    service = OverlayService(workers=1, cache_size=1, work_dir=tmp_path)
+    yield service
+    service.pool.shutdown()
+
+
+def _cached(service: OverlayService, name: str) -> str:
+    path = service.work_dir / "results" / name
+    path.write_text(name)
+    service.results.put(name, str(path))
+    return str(path)
+
+
+def test_evicted_file_in_use_is_deleted_once_released(service: OverlayService):
+    first = _cached(service, "first.fcpxml")
+    service._acquire(first)
+
+    second = _cached(service, "second.fcpxml")
+    assert "first.fcpxml" not in service.results
+    assert Path(first).exists()
+
+    service._release(first)
+    assert not Path(first).exists()
+    assert Path(second).exists()
+
+
+def test_file_cached_again_before_release_is_kept(service: OverlayService):
+    first = _cached(service, "first.fcpxml")
+    service._acquire(first)
+    _cached(service, "second.fcpxml")
+
+    # same result cached again while still being sent
+    service._acquire(first)
+    service.results.put("first.fcpxml", first)
+    service._release(first)
+    service._release(first)
+    assert Path(first).exists()
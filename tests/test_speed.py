@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from ski.gpx import TrackArrays, calculate_speed
+from ski.pipeline import speed_chunks
+from tracks import START, paused_track
+
+SMOOTH_WINDOW = 25
+MAX_GAP_S = 60.0
+
+
+def _gap_index(points) -> int:
+    """Index of the first point after the recording gap."""
+    dt = np.diff([p.time.timestamp() for p in points])
+    return int(np.flatnonzero(dt > MAX_GAP_S)[0]) + 1
+
+
+def test_dense_speed_is_not_smoothed_across_a_gap():
+    points = paused_track()
+    result = calculate_speed(points, smooth_window=SMOOTH_WINDOW, max_gap_s=MAX_GAP_S)
+    speeds = np.array([p.speed_kmh for p in result])
+    gap = _gap_index(points)
+
+    before, after = speeds[gap - 12 : gap], speeds[gap : gap + 12]
+    assert before == pytest.approx(np.full(12, before[0]), rel=1e-6)
+    assert before[0] > 40.0
+    assert after == pytest.approx(np.zeros(12), abs=1e-9)
+
+
+def test_dense_speed_without_gaps_is_a_moving_average():
+    points = paused_track()[:120]
+    speeds = np.array([p.speed_mps for p in calculate_speed(points, smooth_window=SMOOTH_WINDOW)])
+    raw = np.array([p.speed_mps for p in calculate_speed(points, smooth_window=1)])
+
+    kernel = np.ones(SMOOTH_WINDOW) / SMOOTH_WINDOW
+    assert speeds == pytest.approx(np.convolve(raw, kernel, mode="same"))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 37])
+def test_streamed_speed_matches_in_memory(chunk_size: int):
+    points = paused_track()
+    track = TrackArrays.from_points(points)
+    time = track.time - START.timestamp()
+    chunks = (
+        TrackArrays(
+            time=time[i : i + chunk_size],
+            lat=track.lat[i : i + chunk_size],
+            lon=track.lon[i : i + chunk_size],
+            ele=track.ele[i : i + chunk_size],
+        )
+        for i in range(0, len(track), chunk_size)
+    )
+
+    stream = speed_chunks(chunks, START, smooth_window=SMOOTH_WINDOW, max_gap_s=MAX_GAP_S)
+    streamed = [p for chunk in stream for p in chunk]
+    in_memory = calculate_speed(points, smooth_window=SMOOTH_WINDOW, max_gap_s=MAX_GAP_S)
+
+    assert [p.time for p in streamed] == [p.time for p in in_memory]
+    assert [p.speed_kmh for p in streamed] == pytest.approx([p.speed_kmh for p in in_memory])
@@ -0,0 +1,59 @@
+"""Synthetic tracks shared by the tests."""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from ski.gpx import Point
+
+START = datetime(2025, 1, 10, 10, 0, 0, tzinfo=timezone.utc)
+METERS_PER_DEGREE = 111_320.0
+
+
+def descent(
+    start: datetime, seconds: int, speed_mps: float, lat: float = 45.0, ele: float = 2000.0
+) -> List[Point]:
+    """A run heading north at `speed_mps`, one fix per second, losing 3 m per second."""
+    return [
+        Point(
+            time=start + timedelta(seconds=i),
+            lat=lat + i * speed_mps / METERS_PER_DEGREE,
+            lon=6.0,
+            ele=ele - 3.0 * i,
+        )
+        for i in range(seconds)
+    ]
+
+
+def standstill(start: datetime, seconds: int, after: Point) -> List[Point]:
+    return [
+        Point(time=start + timedelta(seconds=i), lat=after.lat, lon=after.lon, ele=after.ele)
+        for i in range(seconds)
+    ]
+
+
+def paused_track() -> List[Point]:
+    """A 42 km/h run, a 2 h pause, then a minute standing still."""
+    run = descent(START, 120, 42 / 3.6)
+    return [*run, *standstill(run[-1].time + timedelta(hours=2), 60, run[-1])]
+
+
+def write_gpx(path: Path, points: List[Point]) -> Path:
+    rows = "\n".join(
+        f'<trkpt lat="{p.lat:.7f}" lon="{p.lon:.7f}"><ele>{p.ele:.1f}</ele>'
+        f"<time>{p.time:%Y-%m-%dT%H:%M:%SZ}</time></trkpt>"
+        for p in points
+    )
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="tests" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<trk><trkseg>\n{rows}\n</trkseg></trk></gpx>\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def relative_times(points: List[Point]) -> np.ndarray:
+    return np.array([(p.time - points[0].time).total_seconds() for p in points])